@@ -2,104 +2,216 @@ import os
 import argparse
 from stage_utils import STAGES
 from instruction import Instruction, INSTR_TYPES
-from utils import sign_safe_binary_conversion, sign_safe_binary_to_int, sign_extend_12
+from utils import sign_safe_binary_conversion
 from alu import ALU
-from core import Core, SingleStageCore, RegisterFile, InsMem, DataMem, State
+from core import Core, SingleStageCore, RegisterFile, InsMem, DataMem, PipelineBuffer, parse_dump_range
+from tracing import Tracer, TRACE_LEVELS, TRACE_OFF, parse_cycle_range
+from binary_trace import BinaryTracer
+from async_trace import AsyncTracer
+from stats import write_performance_metrics, write_stats_json
+from profiling import instrument, format_report
+from checkpoint import save_checkpoint, load_checkpoint
+from cache import parse_cache_spec, build_hierarchy, format_cache_report
+from branch_predictor import PREDICTORS, FetchPredictor, format_predictor_report, format_predictor_comparison
+from pipeview import PIPEVIEW_FORMATS, PipeView, open_pipeview
+from hotspots import profile_hotspots, load_listing, write_hotspots
 
 MemSize = 1000 # memory size, in reality, the memory size should be 2^32, but for this lab, for the space resaon, we keep it as this large number, but the memory is still 32-bit addressable.
 
 class FiveStageCore(Core):
-    def __init__(self, ioDir, imem, dmem):
-        super(FiveStageCore, self).__init__(os.path.join(ioDir,"FS_"), imem, dmem)
+    def __init__(self, ioDir, imem, dmem, tracer=None):
+        super(FiveStageCore, self).__init__(os.path.join(ioDir,"FS_"), imem, dmem, tracer)
         self.opFilePath = os.path.join(ioDir,'StateResult_FS.txt')
-        self.buffer = State() # reuse state class because it encapsulates everything already
+        self.buffer = PipelineBuffer() # reuse state class because it encapsulates everything already
+        self.draining = False
+        self.resume_pc = None
+        self.dcache = None # optional cache.Cache, None keeps every access a one cycle hit
+        self.mem_stall = 0 # cycles left before the pipeline may advance again
+        self.predictor = None # optional branch_predictor.FetchPredictor, None redirects fetch from ID for free
+        self.squash_cycles = 0 # fetch cycles still lost to the last misprediction
+        self.fetch_squashed = False
+        self.pipeview = None # optional pipeview.PipeView told about every stage an instruction enters
+
+    def load_architectural_state(self, pc, registers):
+        super(FiveStageCore, self).load_architectural_state(pc, registers)
+        self.buffer = PipelineBuffer()
+        self.draining = False
+        self.resume_pc = None
+        self.mem_stall = 0
+        self.squash_cycles = 0
+        self.fetch_squashed = False
+
+    def drain(self):
+        # stop issuing new instructions, the core halts once everything already past ID has retired
+        self.draining = True
+
+    def architectural_pc(self):
+        # None until drain() has let the pipeline empty
+        return self.resume_pc
 
     def handle_IF(self):
         # process new instruction
-        if self.state.ID["halted"]:
+        if self.state.ID.halted:
             return
 
-        self.buffer.ID["Instr"] = self.ext_imem.readInstr(self.state.IF["PC"])
+        if self.fetch_squashed:
+            self.fetch_squashed = False
+            return
 
-        self.state.IF["PC"] += 4
+        pc = self.state.IF.PC
+        self.buffer.ID.Instr = self.ext_imem.readInstr(pc)
+        self.buffer.ID.PC = pc
+        if self.pipeview is not None:
+            self.pipeview.fetch(pc)
+
+        if self.predictor is not None:
+            self.state.IF.PC = self.predictor.next_pc(pc)
+        else:
+            self.state.IF.PC += 4
+
+    def redirect(self, next_pc):
+        # IF has already fetched from state.IF.PC in this cycle's model, only a wrong guess costs anything
+        if self.state.IF.PC == next_pc:
+            return False
+        self.state.IF.PC = next_pc
+        if self.predictor is not None:
+            self.squash_cycles = self.predictor.mispredict_penalty
+        return True
 
     def check_branching(self,parsed_instruction):
-        val1, val2 = self.buffer.EX["Read_data1"],self.buffer.EX["Read_data2"]
-
-        if self.buffer.WB["parsed_instr"] and self.buffer.WB["parsed_instr"].control.RegWrite:
-            if parsed_instruction.rs1 and parsed_instruction.rs1 == self.buffer.WB["Wrt_reg_addr"]:
-                val1 = self.buffer.WB["Wrt_data"]
-            elif parsed_instruction.rs2 and parsed_instruction.rs2 == self.buffer.WB["Wrt_reg_addr"]:
-                val2 = self.buffer.WB["Wrt_data"]
-
-        if parsed_instruction.rs1 and parsed_instruction.rs1 == self.buffer.MEM["Wrt_reg_addr"]:
-            val1 = self.buffer.MEM["ALUresult"]
-        elif parsed_instruction.rs2 and parsed_instruction.rs2 == self.buffer.MEM["Wrt_reg_addr"]:
-            val2 = self.buffer.MEM["ALUresult"]
+        val1, val2 = self.buffer.EX.Read_data1,self.buffer.EX.Read_data2
+
+        if self.buffer.WB.parsed_instr and self.buffer.WB.parsed_instr.control.RegWrite:
+            if parsed_instruction.rs1 and parsed_instruction.rs1 == self.buffer.WB.Wrt_reg_addr:
+                val1 = self.buffer.WB.Wrt_data
+            elif parsed_instruction.rs2 and parsed_instruction.rs2 == self.buffer.WB.Wrt_reg_addr:
+                val2 = self.buffer.WB.Wrt_data
+
+        if parsed_instruction.rs1 and parsed_instruction.rs1 == self.buffer.MEM.Wrt_reg_addr:
+            val1 = self.buffer.MEM.ALUresult
+        elif parsed_instruction.rs2 and parsed_instruction.rs2 == self.buffer.MEM.Wrt_reg_addr:
+            val2 = self.buffer.MEM.ALUresult
         
         rs_equal = (val1 == val2)
 
-        return (parsed_instruction.funct3 == '000' and rs_equal) or (parsed_instruction.funct3 == '001' and not rs_equal)
+        return (parsed_instruction.funct3 == 0b000 and rs_equal) or (parsed_instruction.funct3 == 0b001 and not rs_equal)
 
 
 
     def handle_ID(self):
-        if self.state.ID["halted"]:
-            self.state.EX["halted"] = True
-            self.state.ID["nop"] = 1
+        if self.state.ID.halted:
+            self.state.EX.halted = True
+            self.state.ID.nop = 1
             return
 
-        self.state.ID["Instr"] = self.buffer.ID["Instr"]
+        self.state.ID.Instr = self.buffer.ID.Instr
+
+        if self.draining:
+            # the instruction waiting in ID is not issued, execution resumes from it
+            self.resume_pc = self.state.IF.PC if self.state.ID.Instr is None else self.buffer.ID.PC
+            if self.pipeview is not None:
+                self.pipeview.flush("drained before issue")
+            self.state.ID.halted = True
+            self.state.EX.halted = True
+            self.state.ID.nop = 1
+            return
+
+        if self.squash_cycles:
+            # the wrong path fetch is thrown away, nothing reaches EX this cycle
+            self.squash_cycles -= 1
+            self.stats.mispredict_cycles += 1
+            self.fetch_squashed = True
+            self.state.EX.nop = 1
+            if self.pipeview is not None:
+                self.pipeview.mispredict()
+            return
         
-        if not self.state.ID["Instr"]:
+        if self.state.ID.Instr is None:
             return
 
-        parsed_instruction = Instruction(self.buffer.ID["Instr"])
+        parsed_instruction = self.ext_imem.decodeInstr(self.buffer.ID.PC)
 
         if parsed_instruction.instr_type == INSTR_TYPES.HALT:
-            self.state.ID["halted"] = True
-            self.state.EX["halted"] = True
-            self.state.ID["nop"] = 1
+            self.stats.instructions += 1
+            if self.retirement is not None:
+                self.retirement.issue(self.buffer.ID.PC)
+                self.retirement.retire_issued()
+            if self.pipeview is not None:
+                self.pipeview.retire_issued()
+            self.state.ID.halted = True
+            self.state.EX.halted = True
+            self.state.ID.nop = 1
             return
 
         if self.check_load_use_data(parsed_instruction):
+            self.stats.load_use_stalls += 1
+            if self.pipeview is not None:
+                self.pipeview.stall()
             return
 
+        self.stats.instructions += 1
+        if self.retirement is not None:
+            self.retirement.issue(self.buffer.ID.PC)
+
         # pass the instruction itself to the buffer along with state relevant data
-        self.buffer.EX["parsed_instr"] = parsed_instruction
+        self.buffer.EX.parsed_instr = parsed_instruction
         if not parsed_instruction.rs1 is None:
-            self.buffer.EX["Read_data1"] = self.myRF.readRF(parsed_instruction.rs1)
+            self.buffer.EX.Read_data1 = self.myRF.readRF(parsed_instruction.rs1)
         
         if not parsed_instruction.rs2 is None:
-            self.buffer.EX["Read_data2"] = self.myRF.readRF(parsed_instruction.rs2)
+            self.buffer.EX.Read_data2 = self.myRF.readRF(parsed_instruction.rs2)
         
-        if parsed_instruction.control.Branch == 1 and self.check_branching(parsed_instruction):
-            self.state.EX["nop"] = 1
-            self.state.IF["PC"] = self.state.IF["PC"] - 4 + sign_safe_binary_to_int(sign_extend_12(parsed_instruction.imm))
-            return
+        if parsed_instruction.control.Branch == 1:
+            pc = self.buffer.ID.PC
+            taken = self.check_branching(parsed_instruction)
+            self.stats.branches += 1
+            if self.predictor is not None:
+                self.predictor.resolve_branch(pc, taken, pc + parsed_instruction.imm)
+            if self.redirect(pc + parsed_instruction.imm if taken else pc + 4):
+                self.stats.branch_flushes += 1
+            if taken:
+                # a taken branch leaves the pipeline here, a not taken one retires from WB
+                if self.retirement is not None:
+                    self.retirement.retire_issued()
+                if self.pipeview is not None:
+                    self.pipeview.retire_issued()
+                self.state.EX.nop = 1
+                return
 
         if not parsed_instruction.imm is None:
-            self.buffer.EX["Imm"] = parsed_instruction.imm
+            self.buffer.EX.Imm = parsed_instruction.imm
         
         if not parsed_instruction.alu_control is None:
-            self.buffer.EX["alu_op"] = parsed_instruction.alu_control.get_operation()
+            self.buffer.EX.alu_op = parsed_instruction.alu_control.get_operation()
         
         if not parsed_instruction.rd is None:
-            self.buffer.EX["Wrt_reg_addr"] = parsed_instruction.rd
+            self.buffer.EX.Wrt_reg_addr = parsed_instruction.rd
 
         if parsed_instruction.control.Jump == 1:
-            self.myRF.writeRF(parsed_instruction.rd,self.state.IF["PC"])
-            self.state.IF["PC"] = self.state.IF["PC"] - 4 + sign_safe_binary_to_int(sign_extend_12(parsed_instruction.imm))
-            self.state.EX["nop"] = 1
+            pc = self.buffer.ID.PC
+            self.stats.jumps += 1
+            self.myRF.writeRF(parsed_instruction.rd,pc + 4)
+            if self.retirement is not None:
+                self.retirement.retire_issued(parsed_instruction.rd, pc + 4)
+            if self.pipeview is not None:
+                self.pipeview.retire_issued()
+            if self.predictor is not None:
+                self.predictor.resolve_jump(pc, pc + parsed_instruction.imm)
+            if self.redirect(pc + parsed_instruction.imm):
+                self.stats.jump_flushes += 1
+            self.state.EX.nop = 1
             return
 
+        if self.pipeview is not None:
+            self.pipeview.issue()
+
             
 
     def check_load_use_data(self,parsed_instruction):
-        if self.buffer.EX["parsed_instr"] and self.buffer.EX["parsed_instr"].control.MemRead:
-            if (self.buffer.EX["parsed_instr"].rd == parsed_instruction.rs1) or (self.buffer.EX["parsed_instr"].rd == parsed_instruction.rs2):
-                self.state.IF["PC"] -= 4
-                self.state.EX["nop"] = 1
+        if self.buffer.EX.parsed_instr and self.buffer.EX.parsed_instr.control.MemRead:
+            if (self.buffer.EX.parsed_instr.rd == parsed_instruction.rs1) or (self.buffer.EX.parsed_instr.rd == parsed_instruction.rs2):
+                self.state.IF.PC = self.buffer.ID.PC # fetch the stalled instruction again
+                self.state.EX.nop = 1
                 
                 return True
         return False
@@ -107,130 +219,165 @@ class FiveStageCore(Core):
     def check_forwarding(self):
         forwardA,forwardB = 0b00,0b00
 
-        if self.buffer.WB["parsed_instr"] and self.buffer.EX["parsed_instr"] and self.buffer.EX["parsed_instr"].control.RegWrite:
-            if self.buffer.MEM["parsed_instr"] and self.buffer.MEM["parsed_instr"].rd and self.buffer.MEM["parsed_instr"].rd == self.buffer.EX["parsed_instr"].rs1:
+        if self.buffer.WB.parsed_instr and self.buffer.EX.parsed_instr and self.buffer.EX.parsed_instr.control.RegWrite:
+            if self.buffer.MEM.parsed_instr and self.buffer.MEM.parsed_instr.rd and self.buffer.MEM.parsed_instr.rd == self.buffer.EX.parsed_instr.rs1:
                 forwardA = 0b10
-            elif self.buffer.WB["parsed_instr"].rd and self.buffer.WB["parsed_instr"].rd == self.buffer.EX["parsed_instr"].rs1:
+            elif self.buffer.WB.parsed_instr.rd and self.buffer.WB.parsed_instr.rd == self.buffer.EX.parsed_instr.rs1:
                 forwardA = 0b01
         
-            if self.buffer.MEM["parsed_instr"] and self.buffer.MEM["parsed_instr"].rd and self.buffer.MEM["parsed_instr"].rd == self.buffer.EX["parsed_instr"].rs2:
+            if self.buffer.MEM.parsed_instr and self.buffer.MEM.parsed_instr.rd and self.buffer.MEM.parsed_instr.rd == self.buffer.EX.parsed_instr.rs2:
                 forwardB = 0b10
-            elif self.buffer.WB["parsed_instr"].rd and self.buffer.WB["parsed_instr"].rd == self.buffer.EX["parsed_instr"].rs2:
+            elif self.buffer.WB.parsed_instr.rd and self.buffer.WB.parsed_instr.rd == self.buffer.EX.parsed_instr.rs2:
                 forwardB = 0b01
         
         return forwardA,forwardB
 
+    def count_forwarding(self, forward):
+        if forward == 0b10:
+            self.stats.forward_ex_mem += 1
+        elif forward == 0b01:
+            self.stats.forward_mem_wb += 1
+
     def handle_EX(self):
         
-        if self.state.EX["halted"]:
-            self.state.MEM["halted"] = True
-            self.state.EX["nop"] = 1
+        if self.state.EX.halted:
+            self.state.MEM.halted = True
+            self.state.EX.nop = 1
             return
 
-        if self.state.EX["nop"] == 1:
+        if self.state.EX.nop == 1:
+            self.stats.bubbles["EX"] += 1
             self.buffer.reset_EX()
-            self.state.MEM["nop"] = 1
-            self.state.EX["nop"] = 0
+            self.state.MEM.nop = 1
+            self.state.EX.nop = 0
             return
 
 
         forwardA,forwardB = self.check_forwarding()
 
-        self.state.EX["parsed_instr"] = self.buffer.EX["parsed_instr"]
+        self.state.EX.parsed_instr = self.buffer.EX.parsed_instr
 
-        self.state.EX["Read_data1"] = self.buffer.EX["Read_data1"]
+        self.state.EX.Read_data1 = self.buffer.EX.Read_data1
 
-        self.state.EX["Read_data2"] = self.buffer.EX["Read_data2"]
+        self.state.EX.Read_data2 = self.buffer.EX.Read_data2
         
 
-        self.state.EX["Imm"] = self.buffer.EX["Imm"]
-        self.state.EX["alu_op"] = self.buffer.EX["alu_op"]
-        self.state.EX["Wrt_reg_addr"] = self.buffer.EX["Wrt_reg_addr"]
+        self.state.EX.Imm = self.buffer.EX.Imm
+        self.state.EX.alu_op = self.buffer.EX.alu_op
+        self.state.EX.Wrt_reg_addr = self.buffer.EX.Wrt_reg_addr
 
         if forwardA == 0b01:
-            self.state.EX["Read_data1"] = self.buffer.WB["Wrt_data"]
+            self.state.EX.Read_data1 = self.buffer.WB.Wrt_data
         elif forwardA == 0b10:
-            self.state.EX["Read_data1"] = self.buffer.MEM["ALUresult"]
+            self.state.EX.Read_data1 = self.buffer.MEM.ALUresult
             
         if forwardB == 0b01:
-            self.state.EX["Read_data2"] = self.buffer.WB["Wrt_data"]
+            self.state.EX.Read_data2 = self.buffer.WB.Wrt_data
         elif forwardB == 0b10:
-            self.state.EX["Read_data2"] = self.buffer.MEM["ALUresult"]
-
-        if self.state.EX["parsed_instr"]:
-            self.buffer.MEM["parsed_instr"] = self.state.EX["parsed_instr"]
-
-            op1 = self.state.EX["Read_data1"]
-            if self.state.EX["parsed_instr"].control.AluSrc == 0:
-                op2 = self.state.EX["Read_data2"]
+            self.state.EX.Read_data2 = self.buffer.MEM.ALUresult
+
+        if self.state.EX.parsed_instr:
+            if self.pipeview is not None:
+                self.pipeview.execute()
+            self.count_forwarding(forwardA)
+            self.count_forwarding(forwardB)
+            self.buffer.MEM.parsed_instr = self.state.EX.parsed_instr
+
+            op1 = self.state.EX.Read_data1
+            if self.state.EX.parsed_instr.control.AluSrc == 0:
+                op2 = self.state.EX.Read_data2
             else:
-                op2 = sign_safe_binary_to_int(sign_extend_12(self.state.EX["Imm"]))
+                op2 = self.state.EX.Imm
 
-            self.buffer.MEM["ALUresult"] = ALU[self.state.EX["alu_op"]](op1,op2)
+            self.buffer.MEM.ALUresult = ALU[self.state.EX.alu_op](op1,op2)
 
-            self.buffer.MEM["Wrt_reg_addr"] = self.state.EX["Wrt_reg_addr"]
+            self.buffer.MEM.Wrt_reg_addr = self.state.EX.Wrt_reg_addr
             
-            self.buffer.MEM["Store_data"] = self.state.EX["Read_data2"]
+            self.buffer.MEM.Store_data = self.state.EX.Read_data2
 
 
     def handle_MEM(self):
 
-        if self.state.MEM["halted"]:
-            self.state.WB["halted"] = True
-            self.state.MEM["nop"] = 1
+        if self.state.MEM.halted:
+            self.state.WB.halted = True
+            self.state.MEM.nop = 1
             return
 
-        if self.state.MEM["nop"] == 1:
+        if self.state.MEM.nop == 1:
+            self.stats.bubbles["MEM"] += 1
             self.buffer.reset_MEM()
-            self.state.WB["nop"] = 1
-            self.state.MEM["nop"] = 0
+            self.state.WB.nop = 1
+            self.state.MEM.nop = 0
             return
 
-        self.state.MEM["parsed_instr"] = self.buffer.MEM["parsed_instr"]
-        self.state.MEM["ALUresult"] = self.buffer.MEM["ALUresult"]
-        self.state.MEM["Store_data"] = self.buffer.MEM["Store_data"]
-        self.state.MEM["Wrt_reg_addr"] = self.buffer.MEM["Wrt_reg_addr"]
+        self.state.MEM.parsed_instr = self.buffer.MEM.parsed_instr
+        self.state.MEM.ALUresult = self.buffer.MEM.ALUresult
+        self.state.MEM.Store_data = self.buffer.MEM.Store_data
+        self.state.MEM.Wrt_reg_addr = self.buffer.MEM.Wrt_reg_addr
 
 
-        if self.state.MEM["parsed_instr"]:
+        if self.state.MEM.parsed_instr:
+            if self.pipeview is not None:
+                self.pipeview.memory(self.state.MEM.parsed_instr.control.MemWrite == 1)
 
-            self.buffer.WB["parsed_instr"] = self.state.MEM["parsed_instr"]
+            self.buffer.WB.parsed_instr = self.state.MEM.parsed_instr
 
-            if self.state.MEM["parsed_instr"].control.MemWrite == 1:
-                self.ext_dmem.writeDataMem(self.state.MEM["ALUresult"],self.state.MEM["Store_data"])
+            if self.state.MEM.parsed_instr.control.MemWrite == 1:
+                self.ext_dmem.writeDataMem(self.state.MEM.ALUresult,self.state.MEM.Store_data)
+                if self.retirement is not None:
+                    self.retirement.store(self.state.MEM.ALUresult,self.state.MEM.Store_data)
+                if self.dcache is not None:
+                    self.mem_stall = self.dcache.access(self.state.MEM.ALUresult, True)
             
-            if self.state.MEM["parsed_instr"].control.MemtoReg == 1:
-                if self.state.MEM["parsed_instr"].control.MemRead == 1:
-                    read_addr = self.state.MEM["ALUresult"]
-                    read_val = sign_safe_binary_to_int(self.ext_dmem.readDataMem(read_addr))
-                    self.buffer.WB["Wrt_data"] = read_val
-
-            elif self.state.MEM["parsed_instr"].control.MemtoReg == 0:
-                self.buffer.WB["Wrt_data"] = self.state.MEM["ALUresult"]
+            if self.state.MEM.parsed_instr.control.MemtoReg == 1:
+                if self.state.MEM.parsed_instr.control.MemRead == 1:
+                    read_addr = self.state.MEM.ALUresult
+                    read_val = self.ext_dmem.readDataMem(read_addr)
+                    self.buffer.WB.Wrt_data = read_val
+                    if self.dcache is not None:
+                        self.mem_stall = self.dcache.access(read_addr)
+
+            elif self.state.MEM.parsed_instr.control.MemtoReg == 0:
+                self.buffer.WB.Wrt_data = self.state.MEM.ALUresult
             
-            self.buffer.WB["Wrt_reg_addr"] = self.state.MEM["Wrt_reg_addr"]
+            self.buffer.WB.Wrt_reg_addr = self.state.MEM.Wrt_reg_addr
 
 
     def handle_WB(self):
 
-        if self.state.WB["halted"]:
-            self.state.WB["nop"] = 1
+        if self.state.WB.halted:
+            self.state.WB.nop = 1
             return
 
-        if self.state.WB["nop"] == 1:
+        if self.state.WB.nop == 1:
+            self.stats.bubbles["WB"] += 1
             self.buffer.reset_WB()
-            self.state.WB["nop"] = 0
+            self.state.WB.nop = 0
             return
 
-        self.state.WB["parsed_instr"] = self.buffer.WB["parsed_instr"]
-        self.state.WB["Wrt_reg_addr"] = self.buffer.WB["Wrt_reg_addr"]
-        self.state.WB["Wrt_data"] = self.buffer.WB["Wrt_data"]
+        self.state.WB.parsed_instr = self.buffer.WB.parsed_instr
+        self.state.WB.Wrt_reg_addr = self.buffer.WB.Wrt_reg_addr
+        self.state.WB.Wrt_data = self.buffer.WB.Wrt_data
         
-        if self.state.WB["parsed_instr"]:
-            if self.state.WB["parsed_instr"].control.RegWrite:
-                self.myRF.writeRF(self.state.WB["Wrt_reg_addr"],self.state.WB["Wrt_data"])
+        if self.state.WB.parsed_instr:
+            if self.pipeview is not None:
+                self.pipeview.writeback()
+            if self.state.WB.parsed_instr.control.RegWrite:
+                self.myRF.writeRF(self.state.WB.Wrt_reg_addr,self.state.WB.Wrt_data)
+            if self.retirement is not None:
+                self.retirement.retire(self.state.WB.Wrt_reg_addr if self.state.WB.parsed_instr.control.RegWrite else None, self.state.WB.Wrt_data)
 
     def step(self):
+        if self.mem_stall:
+            # a data cache miss freezes every stage until the line arrives
+            self.mem_stall -= 1
+            self.stats.memory_stall_cycles += 1
+            if self.pipeview is not None:
+                self.pipeview.memory_stall()
+            self.trace_cycle()
+            self.cycle += 1
+            return
+
         # Your implementation
         # --------------------- WB stage ---------------------
         self.handle_WB()
@@ -252,63 +399,160 @@ class FiveStageCore(Core):
         self.handle_IF()
 
         
-        if self.state.ID["halted"] and self.state.EX["halted"] and self.state.MEM["halted"] and self.state.WB["halted"]:
+        if self.state.ID.halted and self.state.EX.halted and self.state.MEM.halted and self.state.WB.halted:
             self.halted = True
         
-        self.myRF.outputRF(self.cycle) # dump RF
-        self.printState(self.state, self.cycle) # print states after executing cycle 0, cycle 1, cycle 2 ... 
+        self.trace_cycle()
         
         self.cycle += 1
 
     def printState(self, state, cycle):
+        self.tracer.write(self.opFilePath, self.format_state(state, cycle))
+
+    @staticmethod
+    def format_state(state, cycle):
         printstate = [ "State after executing cycle:\t" + str(cycle) + "\n"]
         printstate.extend(["IF." + key + ": " + str(val) + "\n" for key, val in state.IF.items()])
-        printstate.extend(["ID." + key + ": " + str(val) + "\n" for key, val in state.ID.items()])
+        printstate.extend(["ID." + key + ": " + format_latch_value(key, val) + "\n" for key, val in state.ID.items()])
         printstate.extend(["EX." + key + ": " + str(val) + "\n" for key, val in state.EX.items()])
         printstate.extend(["MEM." + key + ": " + str(val) + "\n" for key, val in state.MEM.items()])
         printstate.extend(["WB." + key + ": " + str(val) + "\n" for key, val in state.WB.items()])
+        return printstate
 
-        if(cycle == 0): perm = "w"
-        else: perm = "a"
-        with open(self.opFilePath, perm) as wf:
-            wf.writelines(printstate)
-
-if __name__ == "__main__":
-     
-    #parse arguments for input file location
-    parser = argparse.ArgumentParser(description='RV32I processor')
-    parser.add_argument('--iodir', default="", type=str, help='Directory containing the input files.')
-    args = parser.parse_args()
-
-    # ioDir = os.path.abspath(args.iodir)
-    ioDir = '/Users/adityachawla/Desktop/course_work/csa_project/risc-v-simulator/TC4'
-    print("IO Directory:", ioDir)
+def format_latch_value(key, val):
+    # instruction words are kept as ints and only shown in binary when dumped
+    if key == "Instr" and val is not None:
+        return sign_safe_binary_conversion(val)
+    return str(val)
 
+def compare_predictors(ioDir, btb_entries=64, bht_entries=256, history_bits=8, mispredict_penalty=1, maxCycles=5000, cacheSpecs=None):
+    # runs the five stage core alone once per predictor, returns [(name, CoreStats)]
     imem = InsMem("Imem", ioDir)
-    dmem_ss = DataMem("SS", ioDir)
-    dmem_fs = DataMem("FS", ioDir)
+    results = []
+    for name in PREDICTORS:
+        if name == "none":
+            continue
+        core = FiveStageCore(ioDir, imem, DataMem("FS", ioDir), Tracer(TRACE_OFF))
+        core.predictor = FetchPredictor(name, btb_entries, bht_entries, history_bits, mispredict_penalty)
+        core.dcache = build_hierarchy(cacheSpecs) if cacheSpecs else None
+        while not core.halted and core.cycle <= maxCycles:
+            core.step()
+        core.stats.cycles = core.cycle + 1 if core.halted else core.cycle # run_simulation counts one more cycle after HALT
+        results.append((name, core.stats))
+    return results
+
+def run_simulation(ioDir, tracer=None, maxCycles=5000, statsPath=None, profile=False, checkpointAt=None, restore=False, dcache=None, predictor=None, delta=False, pipeview=None, hotspots=False, dumpRange=None):
+    imem = InsMem("Imem", ioDir)
+    dmem_ss = DataMem("SS", ioDir, dumpRange, delta=delta)
+    dmem_fs = DataMem("FS", ioDir, dumpRange, delta=delta)
+    if tracer is None:
+        tracer = Tracer()
     
-    ssCore = SingleStageCore(ioDir, imem, dmem_ss)
-    fsCore = FiveStageCore(ioDir, imem, dmem_fs)
+    ssCore = SingleStageCore(ioDir, imem, dmem_ss, tracer)
+    fsCore = FiveStageCore(ioDir, imem, dmem_fs, tracer)
+    fsCore.dcache = dcache
+    fsCore.predictor = predictor
+    if pipeview is not None:
+        fsCore.pipeview = PipeView(fsCore, pipeview)
+    if profile:
+        ssProfiler, fsProfiler = instrument(ssCore), instrument(fsCore)
+    if hotspots:
+        ssHotspots, fsHotspots = profile_hotspots(ssCore), profile_hotspots(fsCore)
+    if restore:
+        for core in (ssCore, fsCore):
+            if os.path.exists(core.ioDir + "Checkpoint.bin"):
+                load_checkpoint(core, core.ioDir + "Checkpoint.bin")
 
     
     while(True):
         if not ssCore.halted:
             ssCore.step()
+            if ssCore.cycle == checkpointAt:
+                save_checkpoint(ssCore, ssCore.ioDir + "Checkpoint.bin")
         
         if not fsCore.halted:
             fsCore.step()
+            if fsCore.cycle == checkpointAt:
+                save_checkpoint(fsCore, fsCore.ioDir + "Checkpoint.bin")
 
         if ssCore.halted and fsCore.halted:
             # artificially add 
-            fsCore.myRF.outputRF(fsCore.cycle) # dump RF
-            fsCore.printState(fsCore.state, fsCore.cycle) 
+            fsCore.trace_cycle()
             fsCore.cycle += 1
             break
             
-        if ssCore.cycle > 5000 or fsCore.cycle > 5000: # fail safe
+        if ssCore.cycle > maxCycles or fsCore.cycle > maxCycles: # fail safe
             break
     
+    ssCore.finish_trace()
+    fsCore.finish_trace()
+    tracer.close()
+    if pipeview is not None:
+        fsCore.pipeview.close()
+
     # dump SS and FS data mem.
     dmem_ss.outputDataMem()
-    dmem_fs.outputDataMem()
\ No newline at end of file
+    dmem_fs.outputDataMem()
+
+    ssCore.stats.cycles = ssCore.cycle
+    fsCore.stats.cycles = fsCore.cycle
+    write_performance_metrics(ioDir, ssCore.stats, fsCore.stats)
+    if statsPath:
+        extra = dict((level.name, level) for level in dcache.levels()) if dcache is not None else {}
+        if predictor is not None:
+            extra["BranchPredictor"] = predictor
+        write_stats_json(statsPath, SingleStageCore=ssCore.stats, FiveStageCore=fsCore.stats, **extra)
+    if dcache is not None:
+        print(format_cache_report("Five Stage", dcache, fsCore.stats.memory_stall_cycles))
+    if predictor is not None:
+        print(format_predictor_report("Five Stage", predictor, fsCore.stats))
+    if profile:
+        print(format_report("Single Stage Core", ssProfiler, ssCore))
+        print(format_report("Five Stage Core", fsProfiler, fsCore))
+    if hotspots:
+        listing = load_listing(ioDir)
+        for core, profiler in ((ssCore, ssHotspots), (fsCore, fsHotspots)):
+            print("Hot spots written to", write_hotspots(core, profiler, listing))
+    return ssCore, fsCore
+
+if __name__ == "__main__":
+     
+    #parse arguments for input file location
+    parser = argparse.ArgumentParser(description='RV32I processor')
+    parser.add_argument('--iodir', default="", type=str, help='Directory containing the input files.')
+    parser.add_argument('--trace', default="cycle", choices=sorted(TRACE_LEVELS), help='How much state to dump: nothing, the final state or every cycle.')
+    parser.add_argument('--trace-format', default="text", choices=["text", "async", "binary"], help='Write text dumps, the same text dumps formatted by a background writer process (see async_trace.py) or compact SS_Trace.bin/FS_Trace.bin files (see binary_trace.py).')
+    parser.add_argument('--stats-json', default=None, type=str, help='Also write the SS and FS statistics (stalls, flushes, forwarding, bubbles) to this JSON file.')
+    parser.add_argument('--profile', action='store_true', help='Time every pipeline stage and the trace output and print where host time goes.')
+    parser.add_argument('--checkpoint-at', default=None, type=int, help='Save SS_Checkpoint.bin and FS_Checkpoint.bin once each core has executed this many cycles.')
+    parser.add_argument('--restore', action='store_true', help='Resume each core from its SS_/FS_Checkpoint.bin in the IO directory.')
+    parser.add_argument('--trace-cycles', default=None, type=parse_cycle_range, help='Only dump cycles in FIRST:LAST when tracing every cycle.')
+    parser.add_argument('--trace-index', action='store_true', help='Write a <trace>.idx cycle index next to every text trace for trace_index.py.')
+    parser.add_argument('--dcache', default=[], action='append', type=parse_cache_spec, help='Put a data cache in front of the five stage core\'s DataMem, e.g. size=1024,line=16,ways=2,policy=lru,write=back,latency=20 (policy lru/fifo/random, write back/through). Repeat for further levels, closest to the core first.')
+    parser.add_argument('--branch-predictor', default="none", choices=PREDICTORS, help='Fetch prediction for the five stage core. none keeps the lab model where ID redirects fetch in the same cycle at no cost, the others squash the wrong path fetch.')
+    parser.add_argument('--btb-entries', default=64, type=int, help='Branch target buffer entries (power of two).')
+    parser.add_argument('--bht-entries', default=256, type=int, help='Branch history table entries for 1bit, 2bit and gshare (power of two).')
+    parser.add_argument('--history-bits', default=8, type=int, help='Global history length for gshare.')
+    parser.add_argument('--mispredict-penalty', default=1, type=int, help='Fetch cycles lost on every misprediction.')
+    parser.add_argument('--compare-predictors', action='store_true', help='Also run the five stage core once with every predictor and print their CPI against not-taken with the same penalty.')
+    parser.add_argument('--pipeview', default=None, type=str, help='Write a per-instruction timeline of the five stage core to this file.')
+    parser.add_argument('--pipeview-format', default="konata", choices=PIPEVIEW_FORMATS, help='konata writes a Kanata log for the Konata viewer, o3 writes gem5 O3PipeView lines.')
+    parser.add_argument('--hotspots', action='store_true', help='Count retirements, stall and flush cycles per PC and loads and stores per address, write SS_/FS_Hotspots.json and a sorted SS_/FS_Hotspots.txt report.')
+    parser.add_argument('--dmem-dump', default=None, type=parse_dump_range, help='Data memory to dump: a START:END byte window or "touched" for every touched 4 KiB page. Defaults to the first 4000 bytes, or the touched pages of an ELF program.')
+    parser.add_argument('--dump-mode', default="full", choices=["full", "delta"], help='delta writes only changed registers and stored words to *_RFDelta.txt/*_DMEMDelta.txt, expand them with delta_dump.py.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir)
+    print("IO Directory:", ioDir)
+
+    predictor = None
+    if args.branch_predictor != "none":
+        predictor = FetchPredictor(args.branch_predictor, args.btb_entries, args.bht_entries, args.history_bits, args.mispredict_penalty)
+    if args.trace_format == "binary":
+        tracer = BinaryTracer(TRACE_LEVELS[args.trace], args.trace_cycles)
+    else:
+        tracer = (AsyncTracer if args.trace_format == "async" else Tracer)(TRACE_LEVELS[args.trace], args.trace_cycles, args.trace_index)
+    run_simulation(ioDir, tracer, statsPath=args.stats_json, profile=args.profile, checkpointAt=args.checkpoint_at, restore=args.restore, dcache=build_hierarchy(args.dcache) if args.dcache else None, predictor=predictor, delta=args.dump_mode == "delta", pipeview=open_pipeview(args.pipeview, args.pipeview_format) if args.pipeview else None, hotspots=args.hotspots, dumpRange=args.dmem_dump)
+    if args.compare_predictors:
+        results = compare_predictors(ioDir, args.btb_entries, args.bht_entries, args.history_bits, args.mispredict_penalty, cacheSpecs=args.dcache)
+        print(format_predictor_comparison("Five Stage", results))
\ No newline at end of file
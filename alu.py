@@ -18,13 +18,13 @@ class AluControl:
         self.instr_type = instr_type
 
     def choose_i_operand(self):
-        if self.funct3 == '000':
+        if self.funct3 == 0b000:
             return 0b010
-        elif self.funct3 == '100':
+        elif self.funct3 == 0b100:
             return 0b1110
-        elif self.funct3 == '110':
+        elif self.funct3 == 0b110:
             return 0b0001
-        elif self.funct3 == '111':
+        elif self.funct3 == 0b111:
             return 0b0000
         else:
             raise Exception("Invalid ALU Control Input")
@@ -38,14 +38,14 @@ class AluControl:
         elif self.alu_op0 == 1:
             return 0b0110
         elif self.alu_op1 == 1:
-            if self.funct7 == '0000000' and self.funct3 == '000':
+            if self.funct7 == 0b0000000 and self.funct3 == 0b000:
                 return 0b0010
-            elif self.funct7 == '0100000' and self.funct3 == '000':
+            elif self.funct7 == 0b0100000 and self.funct3 == 0b000:
                 return 0b0110
-            elif self.funct7 == '0000000' and self.funct3 == '111':
+            elif self.funct7 == 0b0000000 and self.funct3 == 0b111:
                 return 0b0000
-            elif self.funct7 == '0000000' and self.funct3 == '110':
+            elif self.funct7 == 0b0000000 and self.funct3 == 0b110:
                 return 0b0001
-            elif self.funct7 == '0000000' and self.funct3 == '100':
+            elif self.funct7 == 0b0000000 and self.funct3 == 0b100:
                 return 0b1110
         raise Exception("Invalid ALU Control Input")
@@ -0,0 +1,69 @@
+from core import InsMem, DataMem, SingleStageCore
+from NYU_RV32I_6913 import FiveStageCore
+from functional import FunctionalCore
+from translator import TranslatingCore
+from tracing import Tracer, SinkTracer, TRACE_OFF, TRACE_LEVELS
+
+# Simulation without any file I/O: memories come from byte strings, results come back as Python
+# objects and traces, if wanted, go to a caller supplied sink(name, lines).
+
+CORES = {"ss": SingleStageCore, "fs": FiveStageCore, "functional": FunctionalCore, "translated": TranslatingCore}
+FUNCTIONAL_CORES = ("functional", "translated")
+
+class SimulationResult(object):
+    def __init__(self, core):
+        self.core = core
+        self.registers = list(core.myRF.Registers)
+        self.memory = core.ext_dmem.DMem # PagedMemory, read_word/read_bytes/touched_pages
+        self.halted = core.halted
+        self.stats = core.stats
+        self.cycles = core.stats.cycles
+        self.instructions = core.stats.instructions
+
+    def read_word(self, Address):
+        return self.memory.read_word(Address)
+
+    def read_bytes(self, Address, size):
+        return bytes(self.memory.read_bytes(Address, size))
+
+def simulate(program, data=b"", core="fs", max_cycles=None, trace=None, trace_level="cycle", trace_cycles=None, dcache=None, predictor=None):
+    # program and data are Big Endian byte images, laid out like the bytes of imem.txt and dmem.txt.
+    # max_cycles counts instructions for the functional cores. trace is called with the name of the
+    # result file and its lines, exactly what a file based run would have written there. A fetch
+    # outside program, running off its end without HALT for example, raises IndexError.
+    if core not in CORES:
+        raise ValueError("unknown core " + repr(core) + ", expected one of " + ", ".join(sorted(CORES)))
+    if len(program) < 4:
+        raise ValueError("program holds no instructions")
+    if trace is None:
+        tracer = Tracer(TRACE_OFF)
+    else:
+        tracer = SinkTracer(trace, TRACE_LEVELS[trace_level], trace_cycles)
+
+    name = core.upper() if core in ("ss", "fs") else "FN"
+    imem = InsMem("Imem", "", bytearray(program))
+    dmem = DataMem(name, "", image=bytearray(data))
+    sim = CORES[core]("", imem, dmem, tracer)
+    if core == "fs":
+        sim.dcache = dcache
+        sim.predictor = predictor
+    elif dcache is not None or predictor is not None:
+        raise ValueError("caches and branch predictors are only modelled by the five stage core")
+
+    if core in FUNCTIONAL_CORES:
+        sim.run(max_cycles)
+        sim.stats.instructions = sim.instructions
+        sim.stats.cycles = sim.instructions
+        if tracer.level != TRACE_OFF:
+            sim.myRF.outputRF(sim.instructions) # the single dump run_functional writes
+    else:
+        while not sim.halted and (max_cycles is None or sim.cycle < max_cycles):
+            sim.step()
+        if core == "fs" and sim.halted:
+            # run_simulation counts and dumps one more five stage cycle after both cores halt
+            sim.trace_cycle()
+            sim.cycle += 1
+        sim.finish_trace()
+        sim.stats.cycles = sim.cycle
+    tracer.close()
+    return SimulationResult(sim)
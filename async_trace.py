@@ -0,0 +1,133 @@
+import queue
+import multiprocessing
+from operator import attrgetter
+from core import State, SingleStageCore, format_rf, format_rf_delta
+from tracing import Tracer, TRACE_CYCLE
+
+# Text tracing with the formatting done by a writer process. The simulation only copies the traced
+# latch fields and the registers into a record, records go over a bounded queue in batches and the
+# writer turns them into exactly the text Tracer would have written. A full queue blocks the
+# simulation until the writer catches up.
+#   (LAYOUT, number, core name, state file, RF file, RF delta file, delta, [(latch, fields), ...])
+#     sent once per core, before its first snapshot
+#   (SNAPSHOT, number, cycle, registers, (latch field values, ...))
+#   (LINES, path, lines) for dumps that arrive already formatted
+
+LAYOUT = 0
+SNAPSHOT = 1
+LINES = 2
+
+BATCH = 256 # records per queue item
+QUEUE_DEPTH = 64 # batches in flight before the simulation blocks
+
+def state_formatters():
+    from NYU_RV32I_6913 import FiveStageCore
+    return {"SingleStageCore": SingleStageCore.format_state, "FiveStageCore": FiveStageCore.format_state}
+
+class Layout(object):
+    def __init__(self, record):
+        _, _, core_name, self.state_file, self.rf_file, self.delta_file, self.delta, self.latches = record
+        self.format_state = state_formatters()[core_name]
+        self.state = State()
+        self.registers = None # last dumped registers, for delta dumps
+
+    def write(self, tracer, cycle, registers, values):
+        tracer.cycle = cycle
+        if not self.delta:
+            tracer.write(self.rf_file, format_rf(registers, cycle))
+        else:
+            if self.registers is None:
+                changed = range(32)
+            else:
+                changed = [reg for reg in range(32) if registers[reg] != self.registers[reg]]
+            tracer.write(self.delta_file, format_rf_delta(registers, changed, cycle))
+            self.registers = registers
+        for (latch, fields), latch_values in zip(self.latches, values):
+            if len(fields) == 1:
+                latch_values = (latch_values,) # attrgetter of a single field returns the bare value
+            target = getattr(self.state, latch)
+            for key, val in zip(fields, latch_values):
+                setattr(target, key, val)
+        tracer.write(self.state_file, self.format_state(self.state, cycle))
+        tracer.cycle = None
+
+def write_records(records, index=False):
+    tracer = Tracer(index=index)
+    layouts = {}
+    while True:
+        batch = records.get()
+        if batch is None:
+            break
+        for record in batch:
+            if record[0] == SNAPSHOT:
+                layouts[record[1]].write(tracer, record[2], record[3], record[4])
+            elif record[0] == LINES:
+                tracer.write(record[1], record[2])
+            else:
+                layouts[record[1]] = Layout(record)
+    tracer.close()
+
+class AsyncTracer(Tracer):
+    def __init__(self, level=TRACE_CYCLE, cycles=None, index=False, depth=QUEUE_DEPTH):
+        super(AsyncTracer, self).__init__(level, cycles)
+        self.records = multiprocessing.Queue(depth)
+        self.process = multiprocessing.Process(target=write_records, args=(self.records, index), daemon=True)
+        self.process.start()
+        self.batch = []
+        self.layouts = {} # core -> (layout number, [(latch, getter), ...])
+
+    def add_layout(self, core):
+        # SingleStageCore only prints IF, its traced_fields keep the snapshots down to that
+        state = core.state
+        if core.traced_fields:
+            latches = [(latch, tuple(key for name, key in core.traced_fields if name == latch)) for latch in ("IF", "ID", "EX", "MEM", "WB")]
+            latches = [(latch, fields) for latch, fields in latches if fields]
+        else:
+            latches = [(latch, getattr(state, latch).FIELDS) for latch in ("IF", "ID", "EX", "MEM", "WB")]
+        number = len(self.layouts)
+        rf = core.myRF
+        self.append((LAYOUT, number, type(core).__name__, core.opFilePath, rf.outputFile, rf.deltaFile, rf.delta, latches))
+        layout = self.layouts[core] = (number, [(latch, attrgetter(*fields)) for latch, fields in latches])
+        return layout
+
+    def record(self, core, cycle):
+        layout = self.layouts.get(core)
+        if layout is None:
+            layout = self.add_layout(core)
+        number, getters = layout
+        state = core.state
+        self.append((SNAPSHOT, number, cycle, tuple(core.myRF.Registers), tuple([getter(getattr(state, latch)) for latch, getter in getters])))
+
+    def write(self, path, lines):
+        self.append((LINES, path, lines))
+
+    def append(self, record):
+        self.batch.append(record)
+        if len(self.batch) >= BATCH:
+            self.put(self.batch)
+            self.batch = []
+
+    def put(self, item):
+        # blocks while the queue is full, but not forever if the writer died
+        while True:
+            try:
+                self.records.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not self.process.is_alive():
+                    raise RuntimeError("trace writer exited with code %s" % self.process.exitcode)
+
+    def close(self):
+        # flushes everything queued and waits until the writer has closed its files
+        if self.process is None:
+            return
+        if self.batch:
+            self.put(self.batch)
+            self.batch = []
+        self.put(None)
+        self.process.join()
+        exitcode = self.process.exitcode
+        self.process = None
+        self.records.close()
+        if exitcode:
+            raise RuntimeError("trace writer exited with code %d" % exitcode)
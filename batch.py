@@ -0,0 +1,98 @@
+import os
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from NYU_RV32I_6913 import run_simulation
+from tracing import Tracer, TRACE_LEVELS
+from images import find_program
+
+def discover(patterns, root):
+    # each pattern is a directory or a glob, by default every TC* directory under root. Directories
+    # without imem.txt, imem.bin or program.elf are reported and skipped
+    if not patterns:
+        patterns = [os.path.join(root, "TC*")]
+    ioDirs = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if path in ioDirs:
+                continue
+            if not os.path.isdir(path):
+                print("Skipping %s: not a directory" % path, file=sys.stderr)
+            elif find_program(path) is None:
+                print("Skipping %s: no imem.txt, imem.bin or program.elf" % path, file=sys.stderr)
+            else:
+                ioDirs.append(path)
+    return ioDirs
+
+def read_lines(path):
+    # expected results come from other tools, with CRLF endings and sometimes as UTF-16
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        lines = data.decode("utf-16").splitlines()
+    else:
+        lines = data.decode("utf-8", errors="replace").splitlines()
+    # the performance report names the machine specific directory it ran in
+    return [line for line in lines if not line.startswith("IO Directory:")]
+
+def diff_file(expectedPath, actualPath):
+    if not os.path.exists(actualPath):
+        return "not produced"
+    expected, actual = read_lines(expectedPath), read_lines(actualPath)
+    for i, (exp, act) in enumerate(zip(expected, actual)):
+        if exp != act:
+            return "line %d differs" % (i+1)
+    if len(expected) != len(actual):
+        return "%d lines, expected %d" % (len(actual), len(expected))
+    return None
+
+def compare(ioDir, names=None):
+    expectedDir = os.path.join(ioDir, "ExpectedResults")
+    if not os.path.isdir(expectedDir):
+        return []
+    if names is None:
+        names = sorted(os.listdir(expectedDir))
+    diffs = []
+    for name in names:
+        problem = diff_file(os.path.join(expectedDir, name), os.path.join(ioDir, name))
+        if problem:
+            diffs.append(name + ": " + problem)
+    return diffs
+
+def run_case(ioDir, trace, names):
+    start = time.perf_counter()
+    try:
+        run_simulation(ioDir, Tracer(TRACE_LEVELS[trace]))
+    except Exception as e:
+        return ioDir, time.perf_counter() - start, ["simulation failed: " + repr(e)]
+    return ioDir, time.perf_counter() - start, compare(ioDir, names)
+
+def run_batch(ioDirs, trace="cycle", names=None, workers=None):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_case, ioDir, trace, names) for ioDir in ioDirs]
+        for future in futures:
+            yield future.result()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run RV32I test case directories in parallel and diff them against ExpectedResults')
+    parser.add_argument('iodirs', nargs='*', type=str, help='Test case directories or globs, defaults to every TC* directory under --root.')
+    parser.add_argument('--root', default=".", type=str, help='Where to look for TC* directories.')
+    parser.add_argument('--files', nargs='+', default=None, help='Only compare these result files, defaults to everything in ExpectedResults.')
+    parser.add_argument('--trace', default="cycle", choices=sorted(TRACE_LEVELS), help='Trace level for the simulations.')
+    parser.add_argument('--workers', default=None, type=int, help='Number of worker processes, defaults to the number of cores.')
+    args = parser.parse_args()
+
+    ioDirs = discover(args.iodirs, args.root)
+    start = time.perf_counter()
+    passed = 0
+    for ioDir, elapsed, diffs in run_batch(ioDirs, args.trace, args.files, args.workers):
+        status = "FAIL" if diffs else "PASS"
+        passed += not diffs
+        print("%s %-40s %8.3fs" % (status, ioDir, elapsed))
+        for diff in diffs:
+            print("    " + diff)
+    print("%d/%d passed in %.3fs" % (passed, len(ioDirs), time.perf_counter() - start))
+    raise SystemExit(0 if passed == len(ioDirs) else 1)
@@ -0,0 +1,173 @@
+import os
+import struct
+import argparse
+from core import State, SingleStageCore, format_rf
+from instruction import Instruction, Immediate
+from tracing import Tracer, TRACE_CYCLE
+from utils import sign_safe_int
+
+# A binary trace is a header followed by one record per traced cycle:
+#   cycle (uint32) | (tag, value) per latch field | register count | (register, value) per changed register
+# Every latch field takes a tag byte and an int32, so records have a fixed size per core.
+
+MAGIC = b"RVTB"
+VERSION = 1
+HEADER = struct.Struct("<4sBH") # magic, version, length of the text header that follows
+CYCLE = struct.Struct("<I")
+COUNT = struct.Struct("<B")
+REG = struct.Struct("<Bi")
+
+LATCHES = ("IF", "ID", "EX", "MEM", "WB")
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_UINT = 4
+TAG_INSTR = 5
+TAG_IMM = 64 # plus the width of the immediate in bits
+
+def latch_fields(state):
+    return [(latch, key) for latch in LATCHES for key in getattr(state, latch)]
+
+def fields_struct(fields):
+    return struct.Struct("<" + "Bi"*len(fields))
+
+def encode_value(val):
+    # bools before ints, the dumps print False and 0 differently
+    if val is None:
+        return TAG_NONE, 0
+    if val is False:
+        return TAG_FALSE, 0
+    if val is True:
+        return TAG_TRUE, 0
+    if isinstance(val, Instruction):
+        return TAG_INSTR, sign_safe_int(val.instr)
+    if isinstance(val, Immediate):
+        return TAG_IMM + val.bits, val
+    if -2147483648 <= val <= 2147483647:
+        return TAG_INT, val
+    if 0 <= val <= 0xFFFFFFFF:
+        return TAG_UINT, sign_safe_int(val)
+    raise ValueError("Latch value does not fit in 32 bits: " + repr(val))
+
+def decode_value(tag, val, decoded):
+    if tag == TAG_INT:
+        return val
+    if tag == TAG_NONE:
+        return None
+    if tag == TAG_FALSE:
+        return False
+    if tag == TAG_TRUE:
+        return True
+    if tag == TAG_UINT:
+        return val & 0xFFFFFFFF
+    if tag == TAG_INSTR:
+        word = val & 0xFFFFFFFF
+        if word not in decoded:
+            decoded[word] = Instruction(word)
+        return decoded[word]
+    if tag > TAG_IMM:
+        return Immediate(val, tag - TAG_IMM)
+    raise ValueError("Unknown latch tag " + str(tag))
+
+def encode_fields(state, fields):
+    flat = []
+    for latch, key in fields:
+        flat.extend(encode_value(getattr(state, latch)[key]))
+    return flat
+
+def decode_fields(state, fields, flat, decoded):
+    for i, (latch, key) in enumerate(fields):
+        getattr(state, latch)[key] = decode_value(flat[2*i], flat[2*i+1], decoded)
+
+class TraceStream(object):
+    def __init__(self, wf, core):
+        self.wf = wf
+        self.fields = core.traced_fields or latch_fields(core.state)
+        self.record = fields_struct(self.fields)
+        self.registers = [0]*32
+        header = "\n".join([
+            type(core).__name__,
+            os.path.basename(core.opFilePath),
+            os.path.basename(core.myRF.outputFile),
+            ",".join(latch + "." + key for latch, key in self.fields),
+        ]).encode()
+        wf.write(HEADER.pack(MAGIC, VERSION, len(header)) + header)
+
+    def write(self, core, cycle):
+        changed = []
+        for i, val in enumerate(core.myRF.Registers):
+            if val != self.registers[i]:
+                changed.append(i)
+                changed.append(sign_safe_int(val))
+                self.registers[i] = val
+        self.wf.write(CYCLE.pack(cycle))
+        self.wf.write(self.record.pack(*encode_fields(core.state, self.fields)))
+        self.wf.write(struct.pack("<B" + "Bi"*(len(changed)//2), len(changed)//2, *changed))
+
+class BinaryTracer(Tracer):
+    def __init__(self, level=TRACE_CYCLE, cycles=None):
+        super(BinaryTracer, self).__init__(level, cycles)
+        self.streams = {}
+
+    def record(self, core, cycle):
+        path = core.ioDir + "Trace.bin"
+        stream = self.streams.get(path)
+        if stream is None:
+            stream = self.streams[path] = TraceStream(self.open(path, "wb"), core)
+        stream.write(core, cycle)
+
+    def close(self):
+        super(BinaryTracer, self).close()
+        self.streams = {}
+
+def read_trace(path):
+    # yields (core name, state file, RF file) once, then (cycle, state, registers) per record
+    with open(path, "rb") as rf:
+        magic, version, size = HEADER.unpack(rf.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(path + " is not a version " + str(VERSION) + " binary trace")
+        core_name, state_file, rf_file, names = rf.read(size).decode().split("\n")
+        fields = [tuple(name.split(".")) for name in names.split(",")]
+        record = fields_struct(fields)
+        yield core_name, state_file, rf_file
+
+        state, registers, decoded = State(), [0]*32, {}
+        while True:
+            head = rf.read(CYCLE.size)
+            if not head:
+                break
+            cycle = CYCLE.unpack(head)[0]
+            decode_fields(state, fields, record.unpack(rf.read(record.size)), decoded)
+            count = COUNT.unpack(rf.read(COUNT.size))[0]
+            for _ in range(count):
+                reg, val = REG.unpack(rf.read(REG.size))
+                registers[reg] = val
+            yield cycle, state, registers
+
+def convert(path, outDir):
+    from NYU_RV32I_6913 import FiveStageCore
+    cores = {"SingleStageCore": SingleStageCore, "FiveStageCore": FiveStageCore}
+
+    records = read_trace(path)
+    core_name, state_file, rf_file = next(records)
+    format_state = cores[core_name].format_state
+    state_path, rf_path = os.path.join(outDir, state_file), os.path.join(outDir, rf_file)
+
+    tracer = Tracer()
+    for cycle, state, registers in records:
+        tracer.write(rf_path, format_rf(registers, cycle))
+        tracer.write(state_path, format_state(state, cycle))
+    tracer.close()
+    return state_path, rf_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert a binary RV32I trace back to the text state and RF dumps')
+    parser.add_argument('trace', nargs='+', type=str, help='Binary trace files (SS_Trace.bin, FS_Trace.bin).')
+    parser.add_argument('--outdir', default=None, type=str, help='Directory for the text files, defaults to the directory of each trace.')
+    args = parser.parse_args()
+
+    for path in args.trace:
+        outDir = args.outdir or os.path.dirname(os.path.abspath(path))
+        print("Wrote", *convert(path, outDir))
@@ -0,0 +1,172 @@
+# Fetch-side branch prediction for the five stage core. IF asks the FetchPredictor for the next PC,
+# ID resolves branches and jumps, updates the predictor and redirects fetch when the guess was wrong.
+
+PREDICTORS = ("none", "not-taken", "btfn", "1bit", "2bit", "gshare")
+
+class NotTaken(object):
+    def predict(self, pc, target):
+        return False
+
+    def update(self, pc, taken):
+        pass
+
+class BackwardTaken(object):
+    # backward taken, forward not taken: loops close with backward branches
+    def predict(self, pc, target):
+        return target <= pc
+
+    def update(self, pc, taken):
+        pass
+
+class Bimodal(object):
+    def __init__(self, entries=256, bits=2):
+        self.mask = entries - 1
+        self.max = (1 << bits) - 1
+        self.threshold = 1 << (bits - 1)
+        self.counters = [self.threshold - 1] * entries # weakly not taken
+
+    def index(self, pc):
+        return (pc >> 2) & self.mask
+
+    def predict(self, pc, target):
+        return self.counters[self.index(pc)] >= self.threshold
+
+    def update(self, pc, taken):
+        index = self.index(pc)
+        counter = self.counters[index]
+        if taken:
+            self.counters[index] = min(counter + 1, self.max)
+        else:
+            self.counters[index] = max(counter - 1, 0)
+
+class GShare(Bimodal):
+    def __init__(self, entries=256, history_bits=8):
+        super(GShare, self).__init__(entries, 2)
+        self.history = 0
+        self.history_mask = (1 << history_bits) - 1
+
+    def index(self, pc):
+        return ((pc >> 2) ^ self.history) & self.mask
+
+    def update(self, pc, taken):
+        # history is updated when the branch resolves in ID, not speculatively at fetch
+        super(GShare, self).update(pc, taken)
+        self.history = ((self.history << 1) | int(taken)) & self.history_mask
+
+class BranchTargetBuffer(object):
+    # direct mapped, tagged with the full PC so a hit always means a known branch or jump
+    def __init__(self, entries=64):
+        self.mask = entries - 1
+        self.entries = [None] * entries # (pc, target, is_jump)
+        self.lookups = 0
+        self.hits = 0
+
+    def lookup(self, pc):
+        self.lookups += 1
+        entry = self.entries[(pc >> 2) & self.mask]
+        if entry is not None and entry[0] == pc:
+            self.hits += 1
+            return entry
+        return None
+
+    def update(self, pc, target, is_jump):
+        self.entries[(pc >> 2) & self.mask] = (pc, target, is_jump)
+
+class FetchPredictor(object):
+    def __init__(self, name="not-taken", btb_entries=64, bht_entries=256, history_bits=8, mispredict_penalty=1):
+        for size in (btb_entries, bht_entries):
+            if size <= 0 or size & (size - 1):
+                raise ValueError("predictor table sizes must be powers of two")
+        if name == "not-taken":
+            self.direction = NotTaken()
+        elif name == "btfn":
+            self.direction = BackwardTaken()
+        elif name == "1bit":
+            self.direction = Bimodal(bht_entries, 1)
+        elif name == "2bit":
+            self.direction = Bimodal(bht_entries, 2)
+        elif name == "gshare":
+            self.direction = GShare(bht_entries, history_bits)
+        else:
+            raise ValueError("unknown branch predictor " + repr(name))
+        self.name = name
+        self.settings = [name, btb_entries, bht_entries, history_bits, mispredict_penalty]
+        self.btb = BranchTargetBuffer(btb_entries) if name != "not-taken" else None
+        self.mispredict_penalty = mispredict_penalty # fetch cycles lost when ID redirects fetch
+
+    def next_pc(self, pc):
+        if self.btb is None:
+            return pc + 4
+        entry = self.btb.lookup(pc)
+        if entry is None:
+            return pc + 4
+        target, is_jump = entry[1], entry[2]
+        if is_jump or self.direction.predict(pc, target):
+            return target
+        return pc + 4
+
+    def resolve_branch(self, pc, taken, target):
+        self.direction.update(pc, taken)
+        if taken and self.btb is not None:
+            self.btb.update(pc, target, False)
+
+    def resolve_jump(self, pc, target):
+        if self.btb is not None:
+            self.btb.update(pc, target, True)
+
+    def save_state(self):
+        # table contents and global history, as JSON
+        direction = self.direction
+        return {
+            "config": self.settings,
+            "counters": getattr(direction, "counters", None),
+            "history": getattr(direction, "history", None),
+            "btb": self.btb.entries if self.btb is not None else None,
+            "btb_counts": [self.btb.lookups, self.btb.hits] if self.btb is not None else None,
+        }
+
+    def load_state(self, state):
+        if state["config"] != self.settings:
+            raise ValueError("predictor state was saved from %s, this predictor is %s" % (state["config"], self.settings))
+        if state["counters"] is not None:
+            self.direction.counters = list(state["counters"])
+        if state["history"] is not None:
+            self.direction.history = state["history"]
+        if self.btb is not None:
+            self.btb.entries = [tuple(entry) if entry is not None else None for entry in state["btb"]]
+            self.btb.lookups, self.btb.hits = state["btb_counts"]
+
+    def as_dict(self):
+        return {
+            "predictor": self.name,
+            "btb_entries": len(self.btb.entries) if self.btb is not None else 0,
+            "btb_lookups": self.btb.lookups if self.btb is not None else 0,
+            "btb_hits": self.btb.hits if self.btb is not None else 0,
+            "mispredict_penalty": self.mispredict_penalty,
+        }
+
+def format_predictor_report(title, predictor, stats):
+    mispredictions = stats.branch_flushes + stats.jump_flushes
+    lines = [title + " Branch Prediction Statistics-----------------------------\n"]
+    lines.append("Predictor: %s, misprediction penalty %d cycles\n" % (predictor.name, predictor.mispredict_penalty))
+    lines.append("Conditional branches: %d, mispredicted %d\n" % (stats.branches, stats.branch_flushes))
+    lines.append("Jumps: %d, mispredicted %d\n" % (stats.jumps, stats.jump_flushes))
+    if stats.branches + stats.jumps:
+        lines.append("Prediction accuracy: %.4f\n" % (1 - mispredictions / (stats.branches + stats.jumps)))
+    if predictor.btb is not None:
+        lines.append("BTB: %d entries, %d lookups, %d hits\n" % (len(predictor.btb.entries), predictor.btb.lookups, predictor.btb.hits))
+    lines.append("Misprediction stall cycles: %d\n" % stats.mispredict_cycles)
+    return "".join(lines)
+
+def format_predictor_comparison(title, results):
+    # results are (predictor name, five stage CoreStats) with not-taken among them. The default "none"
+    # model redirects fetch for free, so recovery is measured against not-taken with the same penalty.
+    baseline = dict(results)["not-taken"]
+    lines = [title + " Branch Predictor Comparison (baseline not-taken)-----------------------------\n"]
+    lines.append("%-10s %10s %8s %10s %12s %10s %10s\n" % ("predictor", "cycles", "CPI", "mispredicts", "squashed", "CPI delta", "recovered"))
+    for name, stats in results:
+        avoided = baseline.mispredict_cycles - stats.mispredict_cycles
+        recovered = "%.1f%%" % (100.0 * avoided / baseline.mispredict_cycles) if baseline.mispredict_cycles else "-"
+        lines.append("%-10s %10d %8.4f %10d %12d %+10.4f %10s\n" % (name, stats.cycles, stats.cpi(), stats.branch_flushes + stats.jump_flushes,
+                                                                  stats.mispredict_cycles, stats.cpi() - baseline.cpi(), recovered))
+    return "".join(lines)
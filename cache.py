@@ -0,0 +1,159 @@
+import random
+from collections import OrderedDict
+
+# Timing-only cache model. DataMem still holds the data, a Cache only tracks which lines are
+# resident so the core knows how many cycles an access costs. Levels are chained through
+# next_level, the last level's miss_latency is the main memory latency.
+
+POLICIES = ("lru", "fifo", "random")
+WRITE_POLICIES = ("back", "through")
+
+class Cache(object):
+    def __init__(self, name="L1D", size=1024, line_size=16, associativity=1, policy="lru", write="back", miss_latency=10, next_level=None, seed=0):
+        if policy not in POLICIES:
+            raise ValueError("unknown replacement policy " + repr(policy))
+        if write not in WRITE_POLICIES:
+            raise ValueError("unknown write policy " + repr(write))
+        if size <= 0 or line_size <= 0 or associativity <= 0:
+            raise ValueError(name + ": size, line_size and associativity must be positive")
+        if size % (line_size * associativity) or line_size & (line_size - 1):
+            raise ValueError(name + ": size must be a multiple of line_size * associativity and line_size a power of two")
+        self.name = name
+        self.size = size
+        self.line_size = line_size
+        self.associativity = associativity
+        self.policy = policy
+        self.write = write
+        self.miss_latency = miss_latency
+        self.next_level = next_level
+        self.random = random.Random(seed)
+        self.num_sets = size // (line_size * associativity)
+        self.offset_bits = line_size.bit_length() - 1
+        self.sets = [OrderedDict() for _ in range(self.num_sets)] # tag -> dirty, oldest first
+        self.reads = 0
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    def access(self, Address, write=False):
+        # returns the cycles the access costs on top of a hit
+        line = (Address & 0xFFFFFFFF) >> self.offset_bits
+        lines = self.sets[line % self.num_sets]
+        tag = line // self.num_sets
+        if write:
+            self.writes += 1
+        else:
+            self.reads += 1
+
+        if tag in lines:
+            self.hits += 1
+            if self.policy == "lru":
+                lines.move_to_end(tag)
+            if write:
+                if self.write == "back":
+                    lines[tag] = True
+                elif self.next_level is not None:
+                    self.next_level.access(Address, True) # stores drain through a write buffer
+            return 0
+
+        self.misses += 1
+        if write and self.write == "through":
+            # no write allocate, the store goes to the next level behind a write buffer
+            if self.next_level is not None:
+                self.next_level.access(Address, True)
+            return 0
+
+        latency = self.miss_latency
+        if self.next_level is not None:
+            latency += self.next_level.access(Address, False)
+        if len(lines) >= self.associativity:
+            self.evict(lines, line % self.num_sets)
+        lines[tag] = write
+        return latency
+
+    def evict(self, lines, index):
+        if self.policy == "random":
+            victim = self.random.choice(list(lines))
+            dirty = lines.pop(victim)
+        else:
+            victim, dirty = lines.popitem(last=False)
+        self.evictions += 1
+        if dirty:
+            # dirty victims are written back through a write buffer and do not stall the core
+            self.writebacks += 1
+            if self.next_level is not None:
+                self.next_level.access(((victim * self.num_sets) + index) << self.offset_bits, True)
+
+    def levels(self):
+        level = self
+        while level is not None:
+            yield level
+            level = level.next_level
+
+    def hit_rate(self):
+        accesses = self.hits + self.misses
+        return self.hits / accesses if accesses else 0.0
+
+    def config(self):
+        return [self.size, self.line_size, self.associativity, self.policy, self.write, self.miss_latency]
+
+    def save_state(self):
+        # resident lines in replacement order, counters and the random policy's generator, as JSON
+        return {
+            "config": self.config(),
+            "sets": [[[tag, dirty] for tag, dirty in lines.items()] for lines in self.sets],
+            "counters": [self.reads, self.writes, self.hits, self.misses, self.evictions, self.writebacks],
+            "random": self.random.getstate(),
+        }
+
+    def load_state(self, state):
+        if state["config"] != self.config():
+            raise ValueError("%s state was saved from a %s cache, this one is %s" % (self.name, state["config"], self.config()))
+        self.sets = [OrderedDict((tag, dirty) for tag, dirty in lines) for lines in state["sets"]]
+        self.reads, self.writes, self.hits, self.misses, self.evictions, self.writebacks = state["counters"]
+        version, internal, gauss = state["random"]
+        self.random.setstate((version, tuple(internal), gauss))
+
+    def as_dict(self):
+        return {
+            "size": self.size, "line_size": self.line_size, "associativity": self.associativity,
+            "policy": self.policy, "write": self.write, "miss_latency": self.miss_latency,
+            "reads": self.reads, "writes": self.writes, "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "writebacks": self.writebacks, "hit_rate": self.hit_rate(),
+        }
+
+def parse_cache_spec(text):
+    # "size=4096,line=32,ways=4,policy=lru,write=back,latency=20", missing keys keep the defaults
+    names = {"name": "name", "size": "size", "line": "line_size", "ways": "associativity",
+             "policy": "policy", "write": "write", "latency": "miss_latency", "seed": "seed"}
+    kwargs = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in names:
+            raise ValueError("unknown cache option " + repr(key))
+        kwargs[names[key]] = value.strip() if key in ("name", "policy", "write") else int(value, 0)
+    return kwargs
+
+def build_hierarchy(specs):
+    # specs are ordered closest to the core first, returns the first level
+    first = None
+    for depth, spec in reversed(list(enumerate(specs))):
+        kwargs = dict(spec)
+        kwargs.setdefault("name", "L%dD" % (depth + 1))
+        first = Cache(next_level=first, **kwargs)
+    return first
+
+def format_cache_report(title, cache, stall_cycles):
+    lines = [title + " Data Cache Statistics-----------------------------\n"]
+    for level in cache.levels():
+        lines.append("%s: %d B, %d B lines, %d-way %s, write-%s, miss latency %d\n" % (
+            level.name, level.size, level.line_size, level.associativity, level.policy, level.write, level.miss_latency))
+        lines.append("  reads %d writes %d hits %d misses %d evictions %d writebacks %d hit rate %.4f\n" % (
+            level.reads, level.writes, level.hits, level.misses, level.evictions, level.writebacks, level.hit_rate()))
+    lines.append("Memory stall cycles: %d\n" % stall_cycles)
+    return "".join(lines)
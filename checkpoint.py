@@ -0,0 +1,153 @@
+import json
+import zlib
+import struct
+from core import State, PipelineBuffer
+from binary_trace import latch_fields, fields_struct, encode_fields, decode_fields
+from memory import PAGE_SIZE
+
+# A checkpoint is MAGIC, a version byte and a zlib stream holding
+#   meta length (uint32) | JSON meta | State latches | buffer latches | 32 registers (int64) | pages
+# Latches are encoded like binary trace records. Pages are (page number, PAGE_SIZE bytes) for every
+# touched page of the core's DataMem. InsMem is not saved, only a CRC to catch a different program.
+# The meta also holds the core's pending stall, squash and drain counters and the contents of an
+# attached data cache and branch predictor, a checkpoint only restores into a core configured with
+# the same ones.
+
+MAGIC = b"RVCK"
+VERSION = 1
+LENGTH = struct.Struct("<I")
+REGISTERS = struct.Struct("<32q")
+PIPELINE_FIELDS = ("mem_stall", "squash_cycles", "fetch_squashed", "draining", "resume_pc") # FiveStageCore bookkeeping outside the latches
+
+def encode_latches(state):
+    fields = latch_fields(state)
+    return [latch + "." + key for latch, key in fields], fields_struct(fields).pack(*encode_fields(state, fields))
+
+def decode_latches(names, data, offset, decoded, stateClass=State):
+    fields = [tuple(name.split(".")) for name in names]
+    record = fields_struct(fields)
+    state = stateClass()
+    decode_fields(state, fields, record.unpack_from(data, offset), decoded)
+    return state, offset + record.size
+
+def imem_crc(core):
+    return zlib.crc32(core.ext_imem.IMem.data)
+
+def cache_state(core):
+    dcache = getattr(core, "dcache", None)
+    return [level.save_state() for level in dcache.levels()] if dcache is not None else None
+
+def save_checkpoint(core, path):
+    pc = core.architectural_pc() # None for a pipeline caught mid-flight
+
+    latches = {}
+    records = []
+    for name in ("state", "buffer"):
+        if hasattr(core, name):
+            latches[name], record = encode_latches(getattr(core, name))
+            records.append(record)
+
+    pages = core.ext_dmem.DMem.pages
+    meta = json.dumps({
+        "core": type(core).__name__,
+        "cycle": core.cycle,
+        "halted": core.halted,
+        "stage": getattr(core, "stage", None),
+        "pc": pc,
+        "stats": core.stats.as_dict(),
+        "instructions": getattr(core, "instructions", None),
+        "imem_crc": imem_crc(core),
+        "latches": latches,
+        "pipeline": dict((key, getattr(core, key)) for key in PIPELINE_FIELDS if hasattr(core, key)),
+        "dcache": cache_state(core),
+        "predictor": core.predictor.save_state() if getattr(core, "predictor", None) is not None else None,
+    }).encode()
+
+    body = [LENGTH.pack(len(meta)), meta]
+    body.extend(records)
+    body.append(REGISTERS.pack(*core.myRF.Registers))
+    body.append(LENGTH.pack(len(pages)))
+    for number in sorted(pages):
+        body.append(LENGTH.pack(number))
+        body.append(bytes(pages[number]))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC + bytes([VERSION]) + zlib.compress(b"".join(body)))
+
+def read_checkpoint(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC or data[4] != VERSION:
+        raise ValueError(path + " is not a version " + str(VERSION) + " checkpoint")
+    data = zlib.decompress(data[5:])
+
+    size = LENGTH.unpack_from(data, 0)[0]
+    offset = LENGTH.size + size
+    meta = json.loads(data[LENGTH.size:offset].decode())
+
+    latches, decoded = {}, {}
+    for name in ("state", "buffer"):
+        if name in meta["latches"]:
+            stateClass = PipelineBuffer if name == "buffer" else State
+            latches[name], offset = decode_latches(meta["latches"][name], data, offset, decoded, stateClass)
+
+    registers = list(REGISTERS.unpack_from(data, offset))
+    offset += REGISTERS.size
+    pages = {}
+    count = LENGTH.unpack_from(data, offset)[0]
+    offset += LENGTH.size
+    for _ in range(count):
+        number = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+        pages[number] = bytearray(data[offset:offset+PAGE_SIZE])
+        offset += PAGE_SIZE
+    return meta, latches, registers, pages
+
+def load_checkpoint(core, path):
+    # the same core class resumes exactly where the checkpoint was taken, any other class only
+    # takes over the architectural state (PC, registers and data memory) with an empty pipeline
+    meta, latches, registers, pages = read_checkpoint(path)
+    if meta["imem_crc"] != imem_crc(core):
+        raise ValueError(path + " was taken with a different instruction memory")
+
+    if meta["core"] != type(core).__name__:
+        if meta["pc"] is None:
+            raise ValueError(meta["core"] + " checkpoints hold no architectural PC and only restore into a " + meta["core"])
+        core.ext_dmem.DMem.pages = pages
+        core.ext_dmem.mark_pages_dirty(pages)
+        core.load_architectural_state(meta["pc"], registers)
+        core.halted = meta["halted"]
+        return meta
+
+    dcache = getattr(core, "dcache", None)
+    saved = meta.get("dcache")
+    configs = [level.config() for level in dcache.levels()] if dcache is not None else None
+    if (saved and [state["config"] for state in saved]) != configs:
+        raise ValueError(path + " was taken with a different data cache hierarchy")
+    predictor = getattr(core, "predictor", None)
+    saved_predictor = meta.get("predictor")
+    if (saved_predictor and saved_predictor["config"]) != (predictor.settings if predictor is not None else None):
+        raise ValueError(path + " was taken with a different branch predictor")
+    if saved_predictor is not None:
+        predictor.load_state(saved_predictor)
+    if saved is not None:
+        for level, state in zip(dcache.levels(), saved):
+            level.load_state(state)
+    core.ext_dmem.DMem.pages = pages
+    core.ext_dmem.mark_pages_dirty(pages)
+
+    core.load_architectural_state(meta["pc"] or 0, registers)
+    for name, state in latches.items():
+        setattr(core, name, state)
+    for key, val in meta.get("pipeline", {}).items():
+        setattr(core, key, val)
+    if meta["stage"] is not None:
+        core.stage = meta["stage"]
+    core.cycle = meta["cycle"]
+    core.halted = meta["halted"]
+    if meta["instructions"] is not None:
+        core.instructions = meta["instructions"]
+    for key, val in meta["stats"].items():
+        if key in vars(core.stats):
+            setattr(core.stats, key, val)
+    return meta
@@ -1,124 +1,277 @@
 import os
-from utils import sign_safe_binary_conversion, sign_safe_binary_to_int, sign_extend_12
+from utils import sign_safe_binary_conversion
+from memory import ByteMemory, PagedMemory, ADDR_MASK, PAGE_BITS
+from images import load_instruction_image, load_data_segments
+from tracing import Tracer, TRACE_FINAL
+from stats import CoreStats
 from stage_utils import STAGES
 from alu import ALU
 from instruction import Instruction, INSTR_TYPES
 
 MemSize = 1000
+DMEM_DUMP_SIZE = 4000 # bytes dumped from address 0 unless a window is configured
+DUMP_TOUCHED = "touched"
+
+def parse_dump_range(text):
+    # "touched", or a "start:end" byte window, addresses in any base int() accepts
+    if text == DUMP_TOUCHED:
+        return DUMP_TOUCHED
+    start, sep, end = text.partition(":")
+    if not sep:
+        raise ValueError("expected start:end or touched, got " + repr(text))
+    start, end = int(start, 0), int(end, 0)
+    if not 0 <= start < end <= 1 << 32:
+        raise ValueError("dump window %s is empty or outside the 32-bit address space" % text)
+    return (start, end)
+
+class Latch(object):
+    # pipeline latches have a fixed set of slots and are reset in place, a bubble allocates nothing.
+    # Item access and items() behave like the dicts latches used to be, in the same dump order.
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self):
+        self.reset()
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def keys(self):
+        return list(self.FIELDS)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.FIELDS]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+class IFLatch(Latch):
+    __slots__ = FIELDS = ("nop", "PC", "halted")
+
+    def reset(self):
+        self.nop = 0
+        self.PC = 0
+        self.halted = False
+
+class IDLatch(Latch):
+    __slots__ = FIELDS = ("nop", "Instr", "halted")
+
+    def reset(self):
+        self.nop = False
+        self.Instr = None
+        self.halted = False
+
+class FetchLatch(IDLatch):
+    # ID latch of the five stage buffer, also carries the PC the instruction was fetched from
+    __slots__ = ("PC",)
+    FIELDS = IDLatch.FIELDS + ("PC",)
+
+    def reset(self):
+        IDLatch.reset(self)
+        self.PC = 0
+
+class EXLatch(Latch):
+    __slots__ = FIELDS = ("nop", "Read_data1", "Read_data2", "Imm", "Rs", "Rt", "Wrt_reg_addr", "is_I_type",
+                          "rd_mem", "wrt_mem", "alu_op", "wrt_enable", "parsed_instr", "halted")
+
+    def reset(self):
+        self.nop = False
+        self.Read_data1 = 0
+        self.Read_data2 = 0
+        self.Imm = 0
+        self.Rs = 0
+        self.Rt = 0
+        self.Wrt_reg_addr = 0
+        self.is_I_type = False
+        self.rd_mem = 0
+        self.wrt_mem = 0
+        self.alu_op = 0
+        self.wrt_enable = 0
+        self.parsed_instr = None
+        self.halted = False
+
+class MEMLatch(Latch):
+    __slots__ = FIELDS = ("nop", "ALUresult", "Store_data", "Rs", "Rt", "Wrt_reg_addr", "rd_mem", "wrt_mem",
+                          "wrt_enable", "parsed_instr", "halted")
+
+    def reset(self):
+        self.nop = False
+        self.ALUresult = 0
+        self.Store_data = 0
+        self.Rs = 0
+        self.Rt = 0
+        self.Wrt_reg_addr = 0
+        self.rd_mem = 0
+        self.wrt_mem = 0
+        self.wrt_enable = 0
+        self.parsed_instr = None
+        self.halted = False
+
+class WBLatch(Latch):
+    __slots__ = FIELDS = ("nop", "Wrt_data", "Rs", "Rt", "Wrt_reg_addr", "wrt_enable", "parsed_instr", "halted")
+
+    def reset(self):
+        self.nop = False
+        self.Wrt_data = 0
+        self.Rs = 0
+        self.Rt = 0
+        self.Wrt_reg_addr = 0
+        self.wrt_enable = 0
+        self.parsed_instr = None
+        self.halted = False
 
 class State(object):
+    ID_LATCH = IDLatch
+
     def __init__(self):
-        self.reset_ID()
-        self.reset_IF()
-        self.reset_EX()
-        self.reset_MEM()
-        self.reset_WB()
+        self.IF = IFLatch()
+        self.ID = self.ID_LATCH()
+        self.EX = EXLatch()
+        self.MEM = MEMLatch()
+        self.WB = WBLatch()
 
     def reset_EX(self):
-        self.EX = {
-            "nop": False,
-            "Read_data1": 0, 
-            "Read_data2": 0, 
-            "Imm": 0, 
-            "Rs": 0, "Rt": 0, 
-            "Wrt_reg_addr": 0, 
-            "is_I_type": False, 
-            "rd_mem": 0, 
-            "wrt_mem": 0,
-            "alu_op": 0,
-            "wrt_enable": 0,
-            "parsed_instr":None,
-            "halted":False
-        }
-    
+        self.EX.reset()
+
     def reset_IF(self):
-        self.IF = {"nop": 0, "PC": 0,"halted":False}
+        self.IF.reset()
 
     def reset_ID(self):
-        self.ID = {
-            "nop": False,
-            "Instr":None,
-            "halted":False
-            }
+        self.ID.reset()
 
     def reset_MEM(self):
-        self.MEM = {
-            "nop": False,
-            "ALUresult": 0,
-            "Store_data": 0,
-            "Rs": 0,
-            "Rt": 0,
-            "Wrt_reg_addr": 0,
-            "rd_mem": 0, 
-            "wrt_mem": 0,
-            "wrt_enable": 0,
-            "parsed_instr":None,
-            "halted":False
-        }
+        self.MEM.reset()
 
     def reset_WB(self):
-        self.WB = {
-            "nop": False,
-            "Wrt_data": 0,
-            "Rs": 0,
-            "Rt": 0,
-            "Wrt_reg_addr": 0,
-            "wrt_enable": 0,
-            "parsed_instr":None,
-            "halted":False
-        }
-    
+        self.WB.reset()
 
+class PipelineBuffer(State):
+    ID_LATCH = FetchLatch
 
 class InsMem(object):
-    def __init__(self, name, ioDir):
+    def __init__(self, name, ioDir, image=None, entry=0, base=0):
+        # image holds the instruction bytes from address base on, None loads imem.txt, imem.bin or
+        # program.elf from ioDir
         self.id = name
         
-        with open(os.path.join(ioDir,'imem.txt')) as im:
-            self.IMem = [data.replace("\n", "") for data in im.readlines()]
+        if image is None:
+            image, entry, base = load_instruction_image(ioDir)
+        self.IMem = ByteMemory(image)
+        self.entry = entry # PC of the first instruction
+        self.base = base
+
+        self.decoded = {} # PC -> decoded Instruction, filled lazily on first fetch
+        self.listeners = [] # called with the written address whenever instruction memory changes
 
     def readInstr(self, ReadAddress):
         #read instruction memory
-        #return 32 bit hex val
+        #return 32 bit instruction word as an int
         if ReadAddress %4 != 0:
             ReadAddress //= 4 # make sure it is a multiple of 4
-        instr_binary = "".join(self.IMem[ReadAddress:ReadAddress+4]) # read Big Endian instruction
-        return instr_binary # We choose to work with binary instruction as a string
+        return self.IMem.read_uword(self.offset(ReadAddress)) # read Big Endian instruction
+
+    def offset(self, Address):
+        # byte offset of the word at Address, which must lie inside the image
+        offset = Address - self.base
+        if not 0 <= offset <= len(self.IMem) - 4:
+            raise IndexError("instruction address 0x%x is outside the instruction image 0x%x-0x%x" % (Address & 0xFFFFFFFF, self.base, self.base + len(self.IMem)))
+        return offset
+
+    def decodeInstr(self, ReadAddress):
+        # decoded instructions are shared between fetches and cores, nobody may mutate them
+        parsed_instr = self.decoded.get(ReadAddress)
+        if parsed_instr is None:
+            parsed_instr = Instruction(self.readInstr(ReadAddress))
+            self.decoded[ReadAddress] = parsed_instr
+        return parsed_instr
+
+    def writeInstr(self, Address, WriteData):
+        self.IMem.write_word(self.offset(Address), WriteData)
+        self.decoded.clear() # any cached decode may now be stale
+        for listener in self.listeners:
+            listener(Address)
           
 class DataMem(object):
-    def __init__(self, name, ioDir):
+    def __init__(self, name, ioDir, dumpRange=None, image=None, delta=False):
+        # dumpRange is a (start, end) byte window, DUMP_TOUCHED, or None for the first 4000 bytes
+        # (or the whole image if it is longer). ELF data can sit anywhere, it defaults to DUMP_TOUCHED.
+        # delta writes only the words stored to into <name>_DMEMDelta.txt, see delta_dump.py.
+        # image holds the initial data bytes, None loads dmem.txt, dmem.bin or program.elf from ioDir.
+        # The image is only copied page by page as the program touches it
         self.id = name
         self.ioDir = ioDir
-        with open(os.path.join(ioDir,'dmem.txt')) as dm:
-            self.DMem = [data.replace("\n", "") for data in dm.readlines()]
-        
-        while len(self.DMem)<4000:
-            self.DMem.append('00000000')
+        if image is None:
+            segments = load_data_segments(ioDir)
+        else:
+            segments = [(0, image, False)]
+        self.DMem = PagedMemory(backing=segments)
+        if dumpRange is None:
+            if any(swap for address, data, swap in segments):
+                dumpRange = DUMP_TOUCHED
+            else:
+                dumpRange = (0, max([DMEM_DUMP_SIZE] + [address + len(data) for address, data, swap in segments]))
+        self.dumpRange = dumpRange
+        self.delta = delta
+        self.dirty = set() # with delta, addresses of every word written since the image was loaded
 
     def readDataMem(self, ReadAddress):
         #read data memory
-        #return 32 bit hex val
+        #return 32 bit signed int
         if ReadAddress %4 != 0:
             ReadAddress //= 4 # make sure it is a multiple of 4
-        data_binary = "".join(self.DMem[ReadAddress:ReadAddress+4]) # read Big Endian instruction
-        return data_binary
+        return self.DMem.read_word(ReadAddress) # read Big Endian word
         
     def writeDataMem(self, Address, WriteData):
         #write data into byte addressable memory
-        binary_form = sign_safe_binary_conversion(WriteData)
-        for i in range(4):
-            self.DMem[Address+i] = binary_form[8*i:8*i+8]
+        self.DMem.write_word(Address, WriteData)
+        if self.delta:
+            self.dirty.add(Address & ADDR_MASK)
+
+    def mark_pages_dirty(self, numbers):
+        # pages replaced wholesale (checkpoint restore) may differ from the image anywhere
+        if not self.delta:
+            return
+        for number in numbers:
+            self.dirty.update(range(number << PAGE_BITS, (number + 1) << PAGE_BITS, 4))
         
                      
     def outputDataMem(self):
+        if self.delta:
+            self.outputDelta()
+            return
         resPath = os.path.join(self.ioDir, self.id + "_DMEMResult.txt")
-        with open(resPath, "w") as rp:
-            rp.writelines([str(data) + "\n" for data in self.DMem])
+        if self.dumpRange == DUMP_TOUCHED:
+            self.DMem.dump_touched_text(resPath)
+        else:
+            self.DMem.dump_text(resPath, *self.dumpRange)
+
+    def outputDelta(self):
+        # the dump window, then the final value of every written word. The words are read back at dump
+        # time so overlapping unaligned stores come out right whatever order they happened in
+        if self.dumpRange == DUMP_TOUCHED:
+            lines = ["@touched" + "".join(" %x" % number for number in self.DMem.touched_pages()) + "\n"]
+        else:
+            lines = ["@%d %d\n" % tuple(self.dumpRange)]
+        for Address in sorted(self.dirty):
+            lines.append("%08x %08x\n" % (Address, self.DMem.read_uword(Address)))
+        with open(os.path.join(self.ioDir, self.id + "_DMEMDelta.txt"), "w") as f:
+            f.writelines(lines)
 
 class RegisterFile(object):
-    def __init__(self, ioDir):
+    def __init__(self, ioDir, tracer, delta=False):
+        # delta dumps only the registers written since the previous dump, see delta_dump.py
         self.outputFile = ioDir + "RFResult.txt"
+        self.deltaFile = ioDir + "RFDelta.txt"
+        self.tracer = tracer
         self.Registers = [0x0 for i in range(32)]
+        self.delta = delta
+        self.dirty = set(range(32)) # with delta, registers that may differ from the last dump, all of them before the first
     
     def readRF(self, Reg_addr):
         return self.Registers[Reg_addr]
@@ -126,126 +279,189 @@ class RegisterFile(object):
     def writeRF(self, Reg_addr, Wrt_reg_data):
         if Reg_addr:
             self.Registers[Reg_addr] = Wrt_reg_data
+            if self.delta:
+                self.dirty.add(Reg_addr)
          
     def outputRF(self, cycle):
-        op = ["State of RF after executing cycle:\t" + str(cycle) + "\n"]
-        op.extend([str(sign_safe_binary_conversion(val))+"\n" for val in self.Registers])
-        if(cycle == 0): perm = "w"
-        else: perm = "a"
-        with open(self.outputFile, perm) as file:
-            file.writelines(op)
+        if self.delta:
+            self.tracer.write(self.deltaFile, format_rf_delta(self.Registers, self.dirty, cycle))
+            self.dirty.clear()
+        else:
+            self.tracer.write(self.outputFile, format_rf(self.Registers, cycle))
+
+def format_rf(registers, cycle):
+    op = ["State of RF after executing cycle:\t" + str(cycle) + "\n"]
+    op.extend([sign_safe_binary_conversion(val)+"\n" for val in registers])
+    return op
+
+def format_rf_delta(registers, dirty, cycle):
+    op = ["@%d\n" % cycle]
+    op.extend(["%d %08x\n" % (reg, registers[reg] & 0xFFFFFFFF) for reg in sorted(dirty)])
+    return op
 
 class Core(object):
-    def __init__(self, ioDir, imem, dmem):
-        self.myRF = RegisterFile(ioDir)
+    def __init__(self, ioDir, imem, dmem, tracer=None):
+        if tracer is None:
+            tracer = Tracer()
+        self.tracer = tracer
+        self.myRF = RegisterFile(ioDir, tracer, dmem.delta) # registers are dumped like the data memory
         self.cycle = 0
         self.halted = False
         self.ioDir = ioDir
         self.state = State()
+        self.state.IF.PC = imem.entry
         self.ext_imem = imem
         self.ext_dmem = dmem
+        self.stats = CoreStats()
+        self.retirement = None # optional cosim.RetirementLog told about every issued and retired instruction
+
+    traced_fields = None # every latch field of State is part of the trace
+
+    def load_architectural_state(self, pc, registers):
+        # restart from an empty machine at pc with the given registers, data memory is left as is
+        self.state = State()
+        self.state.IF.PC = pc
+        self.myRF.Registers = list(registers)
+        if self.myRF.delta:
+            self.myRF.dirty.update(range(32))
+        self.halted = False
+
+    def architectural_pc(self):
+        # address of the next instruction to execute, None while instructions may be half done
+        return None
+
+    def trace_cycle(self):
+        if self.tracer.wants(self.cycle):
+            self.tracer.record(self, self.cycle) # dump RF and states after executing cycle 0, cycle 1, cycle 2 ... 
+
+    def finish_trace(self):
+        # with final-state tracing nothing has been written yet, dump the last executed cycle
+        if self.tracer.level == TRACE_FINAL:
+            self.tracer.record(self, self.cycle - 1)
 
 class SingleStageCore(Core):
-    def __init__(self, ioDir, imem, dmem):
-        super(SingleStageCore, self).__init__(os.path.join(ioDir,"SS_"), imem, dmem)
+    traced_fields = (("IF", "PC"), ("IF", "nop")) # the only latch fields printState shows
+
+    def __init__(self, ioDir, imem, dmem, tracer=None):
+        super(SingleStageCore, self).__init__(os.path.join(ioDir,"SS_"), imem, dmem, tracer)
         self.opFilePath = os.path.join(ioDir,"StateResult_SS.txt")
         self.stage = STAGES.IF
 
+    def load_architectural_state(self, pc, registers):
+        super(SingleStageCore, self).load_architectural_state(pc, registers)
+        self.stage = STAGES.IF
+
+    def architectural_pc(self):
+        return self.state.IF.PC
+
     def handle_IF(self):
-        if self.state.IF['nop'] == 1:
-            self.state.IF['nop'] = 0
+        if self.state.IF.nop == 1:
+            self.state.IF.nop = 0
             return
-        self.state.ID["Instr"] = self.ext_imem.readInstr(self.state.IF["PC"])
+        self.state.ID.Instr = self.ext_imem.readInstr(self.state.IF.PC)
         self.stage = STAGES.ID
         
     def handle_ID(self):
-        self.parsed_instruction = Instruction(self.state.ID["Instr"])
+        self.parsed_instruction = self.ext_imem.decodeInstr(self.state.IF.PC)
+        self.stats.instructions += 1
+        if self.retirement is not None:
+            self.retirement.issue(self.state.IF.PC)
         if self.parsed_instruction.instr_type == INSTR_TYPES.HALT:
-            self.state.IF['nop'] = 1
+            if self.retirement is not None:
+                self.retirement.retire_issued()
+            self.state.IF.nop = 1
             self.stage = STAGES.IF
             return
 
 
         if not self.parsed_instruction.rs1 is None:
-            self.state.EX["Read_data1"] = self.myRF.readRF(self.parsed_instruction.rs1)
+            self.state.EX.Read_data1 = self.myRF.readRF(self.parsed_instruction.rs1)
         
         if not self.parsed_instruction.rs2 is None:
-            self.state.EX["Read_data2"] = self.myRF.readRF(self.parsed_instruction.rs2)
+            self.state.EX.Read_data2 = self.myRF.readRF(self.parsed_instruction.rs2)
         
         if not self.parsed_instruction.imm is None:
-            self.state.EX["Imm"] = self.parsed_instruction.imm
+            self.state.EX.Imm = self.parsed_instruction.imm
         
         if not self.parsed_instruction.alu_control is None:
-            self.state.EX["alu_op"] = self.parsed_instruction.alu_control.get_operation()
+            self.state.EX.alu_op = self.parsed_instruction.alu_control.get_operation()
         
         if not self.parsed_instruction.rd is None:
-            self.state.EX["Wrt_reg_addr"] = self.parsed_instruction.rd
+            self.state.EX.Wrt_reg_addr = self.parsed_instruction.rd
 
         if self.parsed_instruction.control.Jump == 1:
-            self.myRF.writeRF(self.state.EX["Wrt_reg_addr"],self.state.IF["PC"]+4)
-            self.state.IF["PC"] = self.state.IF["PC"] + sign_safe_binary_to_int(sign_extend_12(self.state.EX["Imm"]))
+            self.myRF.writeRF(self.state.EX.Wrt_reg_addr,self.state.IF.PC+4)
+            if self.retirement is not None:
+                self.retirement.retire_issued(self.state.EX.Wrt_reg_addr, self.state.IF.PC+4)
+            self.state.IF.PC = self.state.IF.PC + self.state.EX.Imm
             self.stage = STAGES.IF
             return
 
         if self.parsed_instruction.control.Branch == 1:
-            rs_equal = (self.state.EX["Read_data1"] == self.state.EX["Read_data2"])
-            if (self.parsed_instruction.funct3 == '000' and rs_equal) or (self.parsed_instruction.funct3 == '001' and not rs_equal):
-                self.state.IF["PC"] += sign_safe_binary_to_int(sign_extend_12(self.state.EX["Imm"]))
+            rs_equal = (self.state.EX.Read_data1 == self.state.EX.Read_data2)
+            if (self.parsed_instruction.funct3 == 0b000 and rs_equal) or (self.parsed_instruction.funct3 == 0b001 and not rs_equal):
+                self.state.IF.PC += self.state.EX.Imm
             else:
-                self.state.IF["PC"] += 4
+                self.state.IF.PC += 4
+            if self.retirement is not None:
+                self.retirement.retire_issued()
             self.stage = STAGES.IF
             return
 
         self.stage = STAGES.EX
 
     def handle_EX(self):
-        op1 = self.state.EX["Read_data1"]
+        op1 = self.state.EX.Read_data1
         if self.parsed_instruction.control.AluSrc == 0:
-            op2 = self.state.EX["Read_data2"]
+            op2 = self.state.EX.Read_data2
         else:
-            op2 = sign_safe_binary_to_int(sign_extend_12(self.state.EX["Imm"]))
+            op2 = self.state.EX.Imm
 
-        self.state.MEM["ALUresult"] = ALU[self.state.EX["alu_op"]](op1,op2)
+        self.state.MEM.ALUresult = ALU[self.state.EX.alu_op](op1,op2)
 
-        self.state.MEM["Wrt_reg_addr"] = self.state.EX["Wrt_reg_addr"]
+        self.state.MEM.Wrt_reg_addr = self.state.EX.Wrt_reg_addr
         
-        self.state.MEM["Store_data"] = self.state.EX["Read_data2"]
+        self.state.MEM.Store_data = self.state.EX.Read_data2
 
         self.stage = STAGES.MEM
 
     def handle_MEM(self):
         
         if self.parsed_instruction.control.MemWrite == 1:
-            self.ext_dmem.writeDataMem(self.state.MEM["ALUresult"],self.state.MEM["Store_data"])
+            self.ext_dmem.writeDataMem(self.state.MEM.ALUresult,self.state.MEM.Store_data)
+            if self.retirement is not None:
+                self.retirement.store(self.state.MEM.ALUresult,self.state.MEM.Store_data)
         
         if self.parsed_instruction.control.MemtoReg == 1:
             if self.parsed_instruction.control.MemRead == 1:
-                read_addr = self.state.MEM["ALUresult"]
-                read_val = sign_safe_binary_to_int(self.ext_dmem.readDataMem(read_addr))
-                self.state.WB["Wrt_data"] = read_val
+                read_addr = self.state.MEM.ALUresult
+                read_val = self.ext_dmem.readDataMem(read_addr)
+                self.state.WB.Wrt_data = read_val
 
         elif self.parsed_instruction.control.MemtoReg == 0:
-            self.state.WB["Wrt_data"] = self.state.MEM["ALUresult"]
+            self.state.WB.Wrt_data = self.state.MEM.ALUresult
         
-        self.state.WB["Wrt_reg_addr"] = self.state.MEM["Wrt_reg_addr"]
+        self.state.WB.Wrt_reg_addr = self.state.MEM.Wrt_reg_addr
 
         self.stage = STAGES.WB
 
     def handle_WB(self):
         if self.parsed_instruction.control.RegWrite:
-            self.myRF.writeRF(self.state.WB["Wrt_reg_addr"],self.state.WB["Wrt_data"])
+            self.myRF.writeRF(self.state.WB.Wrt_reg_addr,self.state.WB.Wrt_data)
+        if self.retirement is not None:
+            self.retirement.retire(self.state.WB.Wrt_reg_addr if self.parsed_instruction.control.RegWrite else None, self.state.WB.Wrt_data)
 
-        self.state.IF["PC"] += 4
+        self.state.IF.PC += 4
         self.stage = STAGES.IF
 
     def step(self):
         # Your implementation
 
-        if self.state.IF['nop'] == 1:
+        if self.state.IF.nop == 1:
             self.halted = True
         else:
         # find the stage
-            if self.stage == STAGES.IF and self.state.IF['nop'] == 0:
+            if self.stage == STAGES.IF and self.state.IF.nop == 0:
                 self.handle_IF()
 
             if self.stage == STAGES.ID:
@@ -260,19 +476,16 @@ class SingleStageCore(Core):
             if self.stage == STAGES.WB:
                 self.handle_WB()
         
-        
-        
-        self.myRF.outputRF(self.cycle) # dump RF
-        self.printState(self.state, self.cycle) # print states after executing cycle 0, cycle 1, cycle 2 ... 
+        self.trace_cycle()
             
         self.cycle += 1
 
     def printState(self, state, cycle):
+        self.tracer.write(self.opFilePath, self.format_state(state, cycle))
+
+    @staticmethod
+    def format_state(state, cycle):
         printstate = ["-"*70+"\n", "State after executing cycle: " + str(cycle) + "\n"]
-        printstate.append("IF.PC: " + str(state.IF["PC"]) + "\n")
-        printstate.append("IF.nop: " + str(state.IF["nop"]) + "\n")
-        
-        if(cycle == 0): perm = "w"
-        else: perm = "a"
-        with open(self.opFilePath, perm) as wf:
-            wf.writelines(printstate)
\ No newline at end of file
+        printstate.append("IF.PC: " + str(state.IF.PC) + "\n")
+        printstate.append("IF.nop: " + str(state.IF.nop) + "\n")
+        return printstate
\ No newline at end of file
@@ -0,0 +1,218 @@
+import os
+import time
+import argparse
+import multiprocessing
+from collections import deque
+
+from core import InsMem, DataMem, SingleStageCore, format_rf
+from NYU_RV32I_6913 import FiveStageCore
+from tracing import Tracer, TRACE_OFF
+from utils import sign_safe_binary_conversion
+
+# A retirement is the tuple (pc, rd, value, store): rd is None when nothing is written (x0 included),
+# store is (address, value) or None, addresses and values are unsigned 32-bit. Plain tuples keep the
+# streams cheap to pickle and let whole batches be compared at once.
+
+CORES = {"SS": SingleStageCore, "FS": FiveStageCore}
+BATCH = 4096 # retirements per message between processes
+MASK = 0xFFFFFFFF
+
+class RetirementLog(object):
+    # a small reorder buffer: instructions enter at issue in program order and leave as Retirement
+    # events once complete, so instructions that leave the five stage core from ID (taken branches,
+    # jumps, HALT) are not reported ahead of older ones still in EX, MEM or WB
+    def __init__(self, core, sink):
+        self.core = core
+        self.sink = sink
+        self.entries = deque() # [pc, rd, value, store, done]
+        self.retired = 0
+
+    def issue(self, pc):
+        self.entries.append([pc, None, 0, None, False])
+
+    def oldest_pending(self):
+        for entry in self.entries:
+            if not entry[4]:
+                return entry
+        raise RuntimeError(type(self.core).__name__ + " retired an instruction it never issued")
+
+    def complete(self, entry, rd, value):
+        if rd:
+            entry[1] = rd
+            entry[2] = value & MASK
+        entry[4] = True
+        entries = self.entries
+        if entries[0] is not entry:
+            return # older instructions are still in flight
+        while entries and entries[0][4]:
+            pc, rd, value, store, _ = entries.popleft()
+            self.sink((pc, rd, value, store))
+            self.retired += 1
+
+    def retire_issued(self, rd=None, value=0):
+        # the instruction issued last is done without going further down the pipeline
+        self.complete(self.entries[-1], rd, value)
+
+    def store(self, address, value):
+        self.oldest_pending()[3] = (address & MASK, value & MASK)
+
+    def retire(self, rd, value):
+        self.complete(self.oldest_pending(), rd, value)
+
+class CosimResult(object):
+    def __init__(self, ioDir, compared, divergence, cores):
+        self.ioDir = ioDir
+        self.compared = compared # retirements both cores agreed on
+        self.divergence = divergence # (SS retirement, FS retirement) that differ, None marks a halted core
+        self.cores = cores # in-process cores as they were at the divergence, None after a parallel run without one
+
+def make_core(name, ioDir):
+    return CORES[name](ioDir, InsMem("Imem", ioDir), DataMem(name, ioDir), Tracer(TRACE_OFF))
+
+def running(core, maxCycles):
+    return not core.halted and (maxCycles is None or core.cycle < maxCycles)
+
+def cosimulate(ioDir, maxCycles=None):
+    # step each core only until it has retired the next instruction, both stop right at a divergence
+    cores = [make_core(name, ioDir) for name in ("SS", "FS")]
+    queues = [deque(), deque()]
+    for core, queue in zip(cores, queues):
+        core.retirement = RetirementLog(core, queue.append)
+
+    compared = 0
+    while True:
+        for core, queue in zip(cores, queues):
+            while not queue and running(core, maxCycles):
+                core.step()
+        if not queues[0] and not queues[1]:
+            return CosimResult(ioDir, compared, None, cores)
+        a = queues[0].popleft() if queues[0] else None
+        b = queues[1].popleft() if queues[1] else None
+        if a != b:
+            return CosimResult(ioDir, compared, (a, b), cores)
+        compared += 1
+
+def stream_retirements(name, ioDir, maxCycles, conn):
+    core = make_core(name, ioDir)
+    batch = []
+
+    def sink(event):
+        batch.append(event)
+        if len(batch) >= BATCH:
+            conn.send(batch[:]) # blocks while the pipe is full, the comparator sets the pace
+            del batch[:]
+
+    core.retirement = RetirementLog(core, sink)
+    while running(core, maxCycles):
+        core.step()
+    if batch:
+        conn.send(batch)
+    conn.send(None)
+    conn.close()
+
+def compare_streams(connections):
+    # returns how many retirements agree and whether the streams diverge after them
+    pending = [[], []]
+    done = [False, False]
+    compared = 0
+    while True:
+        for i, conn in enumerate(connections):
+            if not pending[i] and not done[i]:
+                batch = conn.recv()
+                if batch is None:
+                    done[i] = True
+                else:
+                    pending[i] = batch
+        a, b = pending
+        n = min(len(a), len(b))
+        if n == 0:
+            return compared, bool(a or b)
+        if a[:n] != b[:n]:
+            return compared + next(i for i in range(n) if a[i] != b[i]), True
+        compared += n
+        pending = [a[n:], b[n:]]
+
+def cosimulate_parallel(ioDir, maxCycles=None):
+    # each core runs in its own process and streams its retirements, a divergence is replayed in
+    # process afterwards to capture the pipeline state for the report
+    processes, connections = [], []
+    for name in ("SS", "FS"):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=stream_retirements, args=(name, ioDir, maxCycles, sender), daemon=True)
+        process.start()
+        sender.close()
+        processes.append(process)
+        connections.append(receiver)
+
+    try:
+        compared, diverged = compare_streams(connections)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    if diverged:
+        return cosimulate(ioDir, maxCycles)
+    return CosimResult(ioDir, compared, None, None)
+
+def format_retirement(event):
+    if event is None:
+        return "nothing, the core had halted"
+    pc, rd, value, store = event
+    text = "PC %d" % pc
+    if rd is not None:
+        text += ", x%d <- %d (0x%08x)" % (rd, value, value)
+    if store is not None:
+        text += ", Mem[%d] <- %d (0x%08x)" % (store[0], store[1], store[1])
+    return text
+
+def format_report(result):
+    ss, fs = result.cores
+    a, b = result.divergence
+    pc = (a or b)[0]
+    lines = ["IO Directory: " + result.ioDir + "\n",
+             "Divergence at retired instruction %d\n" % result.compared,
+             "Single Stage retired: " + format_retirement(a) + "\n",
+             "Five Stage retired:   " + format_retirement(b) + "\n"]
+    if a is not None and b is not None and a[0] != b[0]:
+        pcs = (a[0], b[0])
+    else:
+        pcs = (pc,)
+    for address in pcs:
+        lines.append("Instruction at PC %d: %s %r\n" % (address, sign_safe_binary_conversion(ss.ext_imem.readInstr(address)), ss.ext_imem.decodeInstr(address)))
+    for title, core in (("Single Stage", ss), ("Five Stage", fs)):
+        lines.append("\n" + title + " Core at the divergence, after cycle %d-----------------------------\n" % (core.cycle - 1))
+        lines.extend(core.format_state(core.state, core.cycle - 1))
+        lines.extend(format_rf(core.myRF.Registers, core.cycle - 1))
+    return lines
+
+def write_report(result, path=None):
+    if path is None:
+        path = os.path.join(result.ioDir, "CosimReport.txt")
+    with open(path, "w") as rp:
+        rp.writelines(format_report(result))
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the single and five stage cores in lockstep and stop at the first retired instruction they disagree on')
+    parser.add_argument('--iodir', default="", type=str, help='Directory containing the input files.')
+    parser.add_argument('--processes', action='store_true', help='Run each core in its own process connected by a retirement stream.')
+    parser.add_argument('--max-cycles', default=1000000, type=int, help='Stop a core after this many cycles.')
+    parser.add_argument('--report', default=None, type=str, help='Where to write the divergence report, defaults to CosimReport.txt in the IO directory.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir)
+    print("IO Directory:", ioDir)
+    start = time.perf_counter()
+    result = (cosimulate_parallel if args.processes else cosimulate)(ioDir, args.max_cycles)
+    elapsed = time.perf_counter() - start
+
+    if result.divergence is None:
+        print("Cores agree on %d retired instructions (%.3fs)" % (result.compared, elapsed))
+        raise SystemExit(0)
+    print("Cores diverge at retired instruction %d (%.3fs)" % (result.compared, elapsed))
+    print("  Single Stage: " + format_retirement(result.divergence[0]))
+    print("  Five Stage:   " + format_retirement(result.divergence[1]))
+    print("Report written to " + write_report(result, args.report))
+    raise SystemExit(1)
@@ -0,0 +1,74 @@
+import os
+import glob
+import argparse
+from core import format_rf
+from memory import PagedMemory
+from images import load_data_segments
+from tracing import Tracer
+
+# Delta dumps (--dump-mode delta) and their expansion back into the full result files.
+#   <core>_RFDelta.txt    "@cycle" per dump, then "register value" for every register written since
+#                         the previous dump. The first dump lists all 32.
+#   <name>_DMEMDelta.txt  "@start end" (or "@touched" and the page numbers), then "address value" for
+#                         every word stored to. Everything else is the initial image from the IO directory.
+# Values and addresses are 8 hex digits.
+
+def read_rf_delta(path):
+    # yields (cycle, registers) per dump, registers is updated in place
+    registers = [0]*32
+    cycle = None
+    with open(path) as f:
+        for line in f:
+            if line[0] == "@":
+                if cycle is not None:
+                    yield cycle, registers
+                cycle = int(line[1:])
+            else:
+                reg, val = line.split()
+                registers[int(reg)] = int(val, 16)
+    if cycle is not None:
+        yield cycle, registers
+
+def expand_rf(path, outPath):
+    tracer = Tracer()
+    tracer.open(outPath) # an empty delta still gives an empty result file
+    for cycle, registers in read_rf_delta(path):
+        tracer.write(outPath, format_rf(registers, cycle))
+    tracer.close()
+
+def expand_dmem(path, ioDir, outPath):
+    memory = PagedMemory(backing=load_data_segments(ioDir))
+    with open(path) as f:
+        header = f.readline().split()
+        for line in f:
+            Address, val = line.split()
+            memory.write_word(int(Address, 16), int(val, 16))
+    if header[0] == "@touched":
+        memory.dump_touched_text(outPath, [int(number, 16) for number in header[1:]])
+    else:
+        memory.dump_text(outPath, int(header[0][1:]), int(header[1]))
+
+def expand_dir(ioDir, outDir=None):
+    # expands every delta dump in ioDir, returns the files written
+    outDir = outDir or ioDir
+    written = []
+    for path in sorted(glob.glob(os.path.join(ioDir, "*_RFDelta.txt"))):
+        outPath = os.path.join(outDir, os.path.basename(path)[:-len("RFDelta.txt")] + "RFResult.txt")
+        expand_rf(path, outPath)
+        written.append(outPath)
+    for path in sorted(glob.glob(os.path.join(ioDir, "*_DMEMDelta.txt"))):
+        outPath = os.path.join(outDir, os.path.basename(path)[:-len("DMEMDelta.txt")] + "DMEMResult.txt")
+        expand_dmem(path, ioDir, outPath)
+        written.append(outPath)
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Expand delta RF and DMEM dumps into the full *_RFResult.txt and *_DMEMResult.txt files')
+    parser.add_argument('--iodir', default="", type=str, help='Directory holding the delta dumps and the input images they apply to.')
+    parser.add_argument('--outdir', default=None, type=str, help='Where to write the full dumps, defaults to the IO directory.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir)
+    print("IO Directory:", ioDir)
+    for path in expand_dir(ioDir, args.outdir):
+        print("Wrote", path)
@@ -0,0 +1,154 @@
+import os
+import time
+import argparse
+from core import Core, InsMem, DataMem, parse_dump_range
+from instruction import INSTR_TYPES
+from alu import ALU
+from tracing import Tracer
+
+# predecoded operation kinds
+OP_R = 0
+OP_I = 1
+OP_LOAD = 2
+OP_STORE = 3
+OP_BEQ = 4
+OP_BNE = 5
+OP_JAL = 6
+OP_NOP = 7
+OP_HALT = 8
+
+def predecode(parsed_instr):
+    # operation tuple (kind, rd, rs1, rs2, imm, alu) for a decoded Instruction
+    instr_type = parsed_instr.instr_type
+    if instr_type == INSTR_TYPES.HALT:
+        op = (OP_HALT, 0, 0, 0, 0, None)
+    elif instr_type == INSTR_TYPES.R:
+        op = (OP_R, parsed_instr.rd, parsed_instr.rs1, parsed_instr.rs2, 0, ALU[parsed_instr.alu_control.get_operation()])
+    elif instr_type == INSTR_TYPES.I:
+        op = (OP_I, parsed_instr.rd, parsed_instr.rs1, 0, int(parsed_instr.imm), ALU[parsed_instr.alu_control.get_operation()])
+    elif instr_type == INSTR_TYPES.LOAD_I:
+        op = (OP_LOAD, parsed_instr.rd, parsed_instr.rs1, 0, int(parsed_instr.imm), ALU[parsed_instr.alu_control.get_operation()])
+    elif instr_type == INSTR_TYPES.S:
+        op = (OP_STORE, 0, parsed_instr.rs1, parsed_instr.rs2, int(parsed_instr.imm), ALU[parsed_instr.alu_control.get_operation()])
+    elif instr_type == INSTR_TYPES.J:
+        op = (OP_JAL, parsed_instr.rd, 0, 0, int(parsed_instr.imm), None)
+    elif parsed_instr.funct3 == 0b000:
+        op = (OP_BEQ, 0, parsed_instr.rs1, parsed_instr.rs2, int(parsed_instr.imm), None)
+    elif parsed_instr.funct3 == 0b001:
+        op = (OP_BNE, 0, parsed_instr.rs1, parsed_instr.rs2, int(parsed_instr.imm), None)
+    else:
+        op = (OP_NOP, 0, 0, 0, 0, None) # other branch conditions are never taken, as in the pipelines
+    return op
+
+class FunctionalCore(Core):
+    # executes the same RV32I subset as SingleStageCore, one instruction per iteration and no latches
+    def __init__(self, ioDir, imem, dmem, tracer=None):
+        super(FunctionalCore, self).__init__(os.path.join(ioDir,"FN_"), imem, dmem, tracer)
+        self.pc = imem.entry
+        self.instructions = 0
+        self.program = {} # PC -> predecoded operation tuple
+        imem.listeners.append(self.invalidate)
+
+    def invalidate(self, Address):
+        self.program.clear()
+
+    def load_architectural_state(self, pc, registers):
+        super(FunctionalCore, self).load_architectural_state(pc, registers)
+        self.pc = pc
+
+    def architectural_pc(self):
+        return self.pc
+
+    def predecode(self, pc):
+        op = predecode(self.ext_imem.decodeInstr(pc))
+        self.program[pc] = op
+        return op
+
+    def run(self, limit=None):
+        # run until HALT or until `limit` more instructions have executed, returns the number executed
+        regs = self.myRF.Registers
+        readDataMem = self.ext_dmem.readDataMem
+        writeDataMem = self.ext_dmem.writeDataMem
+        program = self.program
+        pc = self.pc
+        count = 0
+        if limit is None:
+            limit = float("inf")
+
+        while count < limit and not self.halted:
+            op = program.get(pc)
+            if op is None:
+                op = self.predecode(pc)
+            kind, rd, rs1, rs2, imm, alu = op
+            count += 1
+
+            if kind == OP_R:
+                if rd:
+                    regs[rd] = alu(regs[rs1], regs[rs2])
+                pc += 4
+            elif kind == OP_I:
+                if rd:
+                    regs[rd] = alu(regs[rs1], imm)
+                pc += 4
+            elif kind == OP_LOAD:
+                val = readDataMem(alu(regs[rs1], imm))
+                if rd:
+                    regs[rd] = val
+                pc += 4
+            elif kind == OP_STORE:
+                writeDataMem(alu(regs[rs1], imm), regs[rs2])
+                pc += 4
+            elif kind == OP_BEQ:
+                pc += imm if regs[rs1] == regs[rs2] else 4
+            elif kind == OP_BNE:
+                pc += imm if regs[rs1] != regs[rs2] else 4
+            elif kind == OP_JAL:
+                if rd:
+                    regs[rd] = pc + 4
+                pc += imm
+            elif kind == OP_HALT:
+                self.halted = True
+            else:
+                pc += 4
+
+        self.pc = pc
+        self.instructions += count
+        return count
+
+    def step(self):
+        self.run(1)
+        self.cycle += 1
+
+def run_functional(ioDir, max_instructions=None, coreClass=FunctionalCore, delta=False, dumpRange=None):
+    imem = InsMem("Imem", ioDir)
+    dmem = DataMem("FN", ioDir, dumpRange, delta=delta)
+    tracer = Tracer()
+    core = coreClass(ioDir, imem, dmem, tracer)
+
+    start = time.perf_counter()
+    core.run(max_instructions)
+    elapsed = time.perf_counter() - start
+
+    # a single RF dump labelled like the final dump of SingleStageCore
+    core.myRF.outputRF(core.instructions)
+    tracer.close()
+    dmem.outputDataMem()
+    return core, elapsed
+
+def main(description, coreClass):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--iodir', default="", type=str, help='Directory containing the input files.')
+    parser.add_argument('--max-instructions', default=10000000, type=int, help='Stop after this many instructions if HALT is not reached.')
+    parser.add_argument('--dump-mode', default="full", choices=["full", "delta"], help='delta writes FN_RFDelta.txt/FN_DMEMDelta.txt, expand them with delta_dump.py.')
+    parser.add_argument('--dmem-dump', default=None, type=parse_dump_range, help='Data memory to dump: a START:END byte window or "touched" for every touched 4 KiB page. Defaults to the first 4000 bytes, or the touched pages of an ELF program.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir)
+    print("IO Directory:", ioDir)
+    core, elapsed = run_functional(ioDir, args.max_instructions, coreClass, args.dump_mode == "delta", args.dmem_dump)
+    print("Instructions executed:", core.instructions, "(halted)" if core.halted else "(instruction limit reached)")
+    if elapsed > 0:
+        print("Instructions per second:", int(core.instructions / elapsed))
+
+if __name__ == "__main__":
+    main('Functional RV32I simulator, final architectural state only', FunctionalCore)
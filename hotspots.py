@@ -0,0 +1,162 @@
+import os
+import re
+import json
+import argparse
+from collections import Counter
+from instruction import disassemble
+
+# Where a program spends its cycles, by instruction address and by data address. profile_hotspots()
+# wraps the methods of one core and its DataMem, cores that are not attached pay nothing.
+#   retired      instructions retired from each PC, from the core's retirement hooks
+#   load_use     cycles each PC waited in ID on a load-use hazard
+#   mem_stall    cycles each PC waited in MEM on a data cache miss
+#   flushes      fetch redirects caused by the branch or jump at each PC, flush_cycles the fetch
+#                cycles they cost (the misprediction penalty, 0 without a branch predictor)
+#   loads/stores accesses to each data address
+
+FIELDS = ("retired", "load_use", "mem_stall", "flushes", "flush_cycles")
+
+class HotspotProfiler(object):
+    def __init__(self):
+        self.retired = Counter()
+        self.load_use = Counter()
+        self.mem_stall = Counter()
+        self.flushes = Counter()
+        self.flush_cycles = Counter()
+        self.loads = Counter()
+        self.stores = Counter()
+
+    def retire(self, event):
+        self.retired[event[0]] += 1
+
+    def cycles(self, pc):
+        # cycles charged to pc: one issue slot per retired instruction plus what it stalled
+        return self.retired[pc] + self.load_use[pc] + self.mem_stall[pc] + self.flush_cycles[pc]
+
+    def pcs(self):
+        pcs = set()
+        for field in FIELDS:
+            pcs.update(getattr(self, field))
+        return sorted(pcs, key=lambda pc: (-self.cycles(pc), pc))
+
+    def as_dict(self):
+        # sparse, only addresses that saw anything are listed
+        return {
+            "pcs": dict((str(pc), [getattr(self, field)[pc] for field in FIELDS]) for pc in self.pcs()),
+            "fields": list(FIELDS),
+            "loads": dict((str(address), count) for address, count in sorted(self.loads.items())),
+            "stores": dict((str(address), count) for address, count in sorted(self.stores.items())),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profiler = cls()
+        for pc, counts in data["pcs"].items():
+            for field, count in zip(data["fields"], counts):
+                getattr(profiler, field)[int(pc)] = count
+        profiler.loads.update(dict((int(address), count) for address, count in data["loads"].items()))
+        profiler.stores.update(dict((int(address), count) for address, count in data["stores"].items()))
+        return profiler
+
+def profile_hotspots(core, profiler=None):
+    from cosim import RetirementLog # cosim imports the five stage core, which imports this module
+    if profiler is None:
+        profiler = HotspotProfiler()
+    if core.retirement is not None:
+        raise ValueError(type(core).__name__ + " already reports its retirements elsewhere")
+    core.retirement = RetirementLog(core, profiler.retire)
+
+    dmem = core.ext_dmem
+    readDataMem, writeDataMem = dmem.readDataMem, dmem.writeDataMem
+
+    def profiled_read(ReadAddress):
+        profiler.loads[ReadAddress] += 1
+        return readDataMem(ReadAddress)
+
+    def profiled_write(Address, WriteData):
+        profiler.stores[Address] += 1
+        writeDataMem(Address, WriteData)
+
+    dmem.readDataMem, dmem.writeDataMem = profiled_read, profiled_write
+
+    if hasattr(core, "mem_stall"):
+        step = core.step
+
+        def profiled_step():
+            # WB has already retired everything older, the oldest instruction in flight is the one
+            # that missed
+            if core.mem_stall:
+                profiler.mem_stall[core.retirement.oldest_pending()[0]] += 1
+            step()
+        core.step = profiled_step
+
+    if hasattr(core, "check_load_use_data"):
+        check_load_use_data = core.check_load_use_data
+
+        def profiled_check(parsed_instruction):
+            stalled = check_load_use_data(parsed_instruction)
+            if stalled:
+                profiler.load_use[core.buffer.ID.PC] += 1
+            return stalled
+        core.check_load_use_data = profiled_check
+
+    if hasattr(core, "redirect"):
+        redirect = core.redirect
+
+        def profiled_redirect(next_pc):
+            # called from ID while the branch or jump is still in buffer.ID
+            flushed = redirect(next_pc)
+            if flushed:
+                profiler.flushes[core.buffer.ID.PC] += 1
+                profiler.flush_cycles[core.buffer.ID.PC] += core.squash_cycles
+            return flushed
+        core.redirect = profiled_redirect
+    return profiler
+
+def load_listing(ioDir):
+    # PC -> source line of Code.asm, one instruction per line in program order. Block comments and
+    # blank lines are skipped and "N:" address prefixes dropped, the listings do not all number
+    # their lines correctly.
+    path = os.path.join(ioDir, "Code.asm")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        text = re.sub(r"/\*.*?\*/", "", f.read(), flags=re.S)
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return dict((4*i, re.sub(r"\s+", " ", re.sub(r"^\d+:\s*", "", line))) for i, line in enumerate(lines))
+
+def format_hotspots(title, profiler, imem, listing, top=None):
+    total = sum(profiler.cycles(pc) for pc in profiler.pcs()) or 1
+    lines = [title + " Hot Spots-----------------------------\n"]
+    lines.append("%8s %10s %6s %10s %10s %8s %8s  %s\n" % ("PC", "retired", "share", "load-use", "mem-stall", "flushes", "lost", "instruction"))
+    for pc in profiler.pcs()[:top]:
+        text = listing.get(pc) or disassemble(imem.decodeInstr(pc))
+        lines.append("%8d %10d %5.1f%% %10d %10d %8d %8d  %s\n" % (pc, profiler.retired[pc], 100.0 * profiler.cycles(pc) / total, profiler.load_use[pc],
+                                                                  profiler.mem_stall[pc], profiler.flushes[pc], profiler.flush_cycles[pc], text))
+    for name, counts in (("Loads", profiler.loads), ("Stores", profiler.stores)):
+        lines.append("\n%s by address: %d accesses to %d addresses\n" % (name, sum(counts.values()), len(counts)))
+        for address, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top]:
+            lines.append("%10d  0x%08x %10d\n" % (address, address & 0xFFFFFFFF, count))
+    return lines
+
+def write_hotspots(core, profiler, listing):
+    # <core>_Hotspots.json, the compact counts, and <core>_Hotspots.txt, the sorted report
+    with open(core.ioDir + "Hotspots.json", "w") as f:
+        json.dump(profiler.as_dict(), f, separators=(",", ":"))
+    with open(core.ioDir + "Hotspots.txt", "w") as f:
+        f.writelines(format_hotspots(type(core).__name__, profiler, core.ext_imem, listing))
+    return core.ioDir + "Hotspots.txt"
+
+if __name__ == "__main__":
+    from core import InsMem
+    parser = argparse.ArgumentParser(description='Print the hot spot report of a saved *_Hotspots.json profile')
+    parser.add_argument('profile', type=str, help='SS_Hotspots.json or FS_Hotspots.json.')
+    parser.add_argument('--iodir', default=None, type=str, help='Directory with imem.txt and Code.asm, defaults to the directory of the profile.')
+    parser.add_argument('--top', default=20, type=int, help='Rows per table.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir or os.path.dirname(os.path.abspath(args.profile)))
+    with open(args.profile) as f:
+        profiler = HotspotProfiler.from_dict(json.load(f))
+    title = os.path.basename(args.profile).split("_")[0]
+    print("".join(format_hotspots(title, profiler, InsMem("Imem", ioDir), load_listing(ioDir), args.top)), end="")
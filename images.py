@@ -0,0 +1,158 @@
+import os
+import mmap
+import struct
+import argparse
+from memory import BYTE_LINES, load_text_image, swap_words
+
+# Program images come as
+#   imem.txt / dmem.txt  one byte per line written as 8 binary digits (the lab format)
+#   imem.bin / dmem.bin  the same bytes as a flat binary file, memory mapped instead of read
+#   program.elf          a little endian ELF32 RISC-V executable, executable segments are the
+#                        instruction memory and every loadable segment is data memory, so
+#                        constants linkers place in the text segment (.rodata) can be loaded
+# Flat binaries hold the bytes in the simulator's Big Endian word order, exactly like the text files.
+# Flat images always start at address 0, ELF images are built from their lowest segment address.
+
+ELF_HEADER = struct.Struct("<16sHHIIIIIHHHHHH")
+PROGRAM_HEADER = struct.Struct("<IIIIIIII")
+EM_RISCV = 243
+PT_LOAD = 1
+PF_X = 1
+FLAT_IMAGE_LIMIT = 1 << 20 # highest address from-elf zero fills a flat image up to
+
+def load_binary_image(path):
+    # copy-on-write mapping, pages are only read from disk when touched and writes stay private
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return bytearray()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+def save_binary_image(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def save_text_image(path, data):
+    with open(path, "w") as f:
+        f.write("".join(map(BYTE_LINES.__getitem__, bytes(data))))
+
+def load_image(path):
+    if path.endswith(".txt"):
+        return load_text_image(path)
+    return load_binary_image(path)
+
+class ElfImage(object):
+    def __init__(self, path):
+        self.path = path
+        self.data = load_binary_image(path)
+        if len(self.data) < ELF_HEADER.size or self.data[:4] != b"\x7fELF":
+            raise ValueError(path + " is not an ELF file")
+        (ident, e_type, e_machine, e_version, self.entry, e_phoff, e_shoff, e_flags, e_ehsize,
+         e_phentsize, e_phnum, e_shentsize, e_shnum, e_shstrndx) = ELF_HEADER.unpack_from(self.data, 0)
+        if ident[4] != 1 or ident[5] != 1:
+            raise ValueError(path + " is not a little endian ELF32 file")
+        if e_machine != EM_RISCV:
+            raise ValueError(path + " is not a RISC-V executable (machine %d)" % e_machine)
+
+        view = memoryview(self.data)
+        self.segments = [] # (address, file bytes as a view into the mapping, executable)
+        for i in range(e_phnum):
+            p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags, p_align = PROGRAM_HEADER.unpack_from(self.data, e_phoff + i * e_phentsize)
+            if p_type != PT_LOAD:
+                continue
+            if p_vaddr % 4:
+                raise ValueError("%s: segment at 0x%x is not word aligned" % (path, p_vaddr))
+            # memory beyond p_filesz (.bss) is zero, which is what untouched memory reads as anyway
+            self.segments.append((p_vaddr, view[p_offset:p_offset + p_filesz], bool(p_flags & PF_X)))
+
+    def load_segments(self, executable_only):
+        return [(address, data) for address, data, executable in self.segments if executable or not executable_only]
+
+    def bounds(self, executable_only):
+        # (lowest address, end) of the segments, (0, 0) if there are none
+        segments = self.load_segments(executable_only)
+        if not segments:
+            return 0, 0
+        return min(address for address, data in segments), max(address + len(data) for address, data in segments)
+
+    def dense_image(self, executable_only):
+        # (base, image): the segments copied into one image starting at the lowest segment address
+        segments = self.load_segments(executable_only)
+        base, end = self.bounds(executable_only)
+        image = bytearray(end - base)
+        for address, data in segments:
+            swapped = swap_words(data)
+            image[address - base:address - base + len(swapped)] = swapped
+        return base, image
+
+    def text_image(self):
+        # instruction memory is dense, so the executable segments are copied once
+        return self.dense_image(True)
+
+    def data_segments(self):
+        return [(address, data, True) for address, data, executable in self.segments]
+
+def find_image(ioDir, name):
+    for ext in (".txt", ".bin"):
+        path = os.path.join(ioDir, name + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def find_program(ioDir):
+    # the file load_instruction_image reads, None if ioDir holds no program
+    path = find_image(ioDir, "imem")
+    if path is None and os.path.exists(os.path.join(ioDir, "program.elf")):
+        path = os.path.join(ioDir, "program.elf")
+    return path
+
+def load_instruction_image(ioDir):
+    # returns the instruction bytes, the PC execution starts at and the address of the first byte
+    path = find_program(ioDir)
+    if path is None:
+        raise FileNotFoundError("no imem.txt, imem.bin or program.elf in " + ioDir)
+    if not path.endswith(".elf"):
+        return load_image(path), 0, 0
+    elf = ElfImage(path)
+    base, image = elf.text_image()
+    return image, elf.entry, base
+
+def load_data_segments(ioDir):
+    # (address, data, swap) segments for PagedMemory, nothing is copied until a page is touched.
+    # swap is only set for ELF segments.
+    path = find_image(ioDir, "dmem")
+    if path is not None:
+        return [(0, load_image(path), False)]
+    elfPath = os.path.join(ioDir, "program.elf")
+    if os.path.exists(elfPath):
+        return ElfImage(elfPath).data_segments()
+    raise FileNotFoundError("no dmem.txt, dmem.bin or program.elf in " + ioDir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert program images between the text, flat binary and ELF forms')
+    parser.add_argument('command', choices=["to-bin", "to-txt", "from-elf"], help='to-bin/to-txt convert one image, from-elf writes imem and dmem images for an executable.')
+    parser.add_argument('source', type=str, help='Image or ELF file to read.')
+    parser.add_argument('target', type=str, help='Image to write, or the output directory for from-elf.')
+    parser.add_argument('--format', default="txt", choices=["txt", "bin"], help='Image format written by from-elf.')
+    args = parser.parse_args()
+
+    if args.command == "to-bin":
+        save_binary_image(args.target, load_image(args.source))
+    elif args.command == "to-txt":
+        save_text_image(args.target, load_image(args.source))
+    else:
+        elf = ElfImage(args.source)
+        if elf.entry != 0:
+            print("Warning: entry point is 0x%x, the image files start execution at 0" % elf.entry)
+        images = []
+        for name, executable_only in (("imem", True), ("dmem", False)):
+            # checked before anything is copied, the segments of a data image can be gigabytes apart
+            end = elf.bounds(executable_only)[1]
+            if end > FLAT_IMAGE_LIMIT:
+                parser.error("%s ends at 0x%x, a flat %s image starts at 0 and would be zero filled up to it. "
+                             "Link below 0x%x or run program.elf directly" % (args.source, end, name, FLAT_IMAGE_LIMIT))
+            base, image = elf.dense_image(executable_only)
+            images.append((name, bytes(base) + image))
+        save = save_text_image if args.format == "txt" else save_binary_image
+        os.makedirs(args.target, exist_ok=True)
+        for name, image in images:
+            save(os.path.join(args.target, name + "." + args.format), image)
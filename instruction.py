@@ -1,6 +1,23 @@
 # using a class as a enum
 from alu import AluControl
 from rv32_constants import OPCODE_TO_INSTR_TYPE, INSTR_TYPES, INSTR_TYPE_TO_CONTROL
+from utils import sign_extend
+
+class Immediate(int):
+    # sign extended immediate that still prints as the raw bit field of the instruction
+    def __new__(cls, value, bits):
+        imm = super(Immediate, cls).__new__(cls, sign_extend(value, bits))
+        imm.bits = bits
+        return imm
+
+    def __str__(self):
+        return format(self & ((1 << self.bits) - 1), '0' + str(self.bits) + 'b')
+
+    __repr__ = __str__
+
+    def __reduce__(self):
+        return (Immediate, (int(self), self.bits))
+
 class Instruction:
     
     def initialize(self):
@@ -18,7 +35,7 @@ class Instruction:
     def __init__(self,instr):
         self.initialize()
         self.instr = instr
-        self.opcode = self.index_instr(0,6)[::-1]
+        self.opcode = instr & 0x7f
         self.instr_type = OPCODE_TO_INSTR_TYPE[self.opcode]
 
         if self.instr_type == INSTR_TYPES.HALT:
@@ -31,22 +48,27 @@ class Instruction:
         self.parse_control()
         
 
+    def __reduce__(self):
+        # pickled as the instruction word alone, the other side decodes it again
+        return (Instruction, (self.instr,))
+
     def __repr__(self):
         return f"""
 rs1:{self.rs1},
 rs2:{self.rs2},
 rd:{self.rd},
-funct7:{self.funct7},
-funct3:{self.funct3},
-opcode:{self.opcode},
+funct7:{format_field(self.funct7,7)},
+funct3:{format_field(self.funct3,3)},
+opcode:{format_field(self.opcode,7)},
 imm:{self.imm}
         """
 
     def index_instr(self,i,j):
-        return self.instr[31-j:32-i][::-1]
+        # bits i..j (inclusive) of the instruction as an int
+        return (self.instr >> i) & ((1 << (j-i+1)) - 1)
 
     def rev_index(self,i):
-        return self.instr[31-i]
+        return (self.instr >> i) & 1
 
     def parse_control(self):
         self.control = INSTR_TYPE_TO_CONTROL[self.instr_type]
@@ -58,37 +80,58 @@ imm:{self.imm}
 
     def parse_imm(self):
         if self.instr_type in [INSTR_TYPES.I,INSTR_TYPES.LOAD_I]:
-            imm = self.index_instr(20,31)
-            self.imm = imm[::-1]
+            self.imm = Immediate(self.index_instr(20,31),12)
         elif self.instr_type == INSTR_TYPES.J:
-            imm = '0' + self.index_instr(21,30) + self.rev_index(20) + self.index_instr(12,19) + self.rev_index(31)
-            self.imm = imm[::-1]
+            imm = self.rev_index(31) << 20 | self.index_instr(12,19) << 12 | self.rev_index(20) << 11 | self.index_instr(21,30) << 1
+            self.imm = Immediate(imm,21)
         elif self.instr_type == INSTR_TYPES.B:
-            imm = '0' + self.index_instr(8,11) + self.index_instr(25,30) + self.rev_index(7) + self.rev_index(31)
-            self.imm = imm[::-1]
+            imm = self.rev_index(31) << 12 | self.rev_index(7) << 11 | self.index_instr(25,30) << 5 | self.index_instr(8,11) << 1
+            self.imm = Immediate(imm,13)
         elif self.instr_type == INSTR_TYPES.S:
-            imm = self.index_instr(7,11) + self.index_instr(25,31)
-            self.imm = imm[::-1]
+            imm = self.index_instr(25,31) << 5 | self.index_instr(7,11)
+            self.imm = Immediate(imm,12)
 
     def parse_source_registers(self):
         if self.instr_type != INSTR_TYPES.J:
-            rs1 = self.index_instr(15,19)
-            self.rs1 = int(rs1[::-1],2)
+            self.rs1 = self.index_instr(15,19)
 
         if self.instr_type in [INSTR_TYPES.R,INSTR_TYPES.S,INSTR_TYPES.B]:
-            rs2 = self.index_instr(20,24)
-            self.rs2 = int(rs2[::-1],2)
+            self.rs2 = self.index_instr(20,24)
 
     def parse_funct_types(self):
         if self.instr_type != INSTR_TYPES.J:
-            funct3 = self.index_instr(12,14)
-            self.funct3 = funct3[::-1]
+            self.funct3 = self.index_instr(12,14)
         
         if self.instr_type == INSTR_TYPES.R:
-            funct7 = self.index_instr(25,31)
-            self.funct7 = funct7[::-1]
+            self.funct7 = self.index_instr(25,31)
 
     def parse_dest_register(self):
         if not self.instr_type in [INSTR_TYPES.S,INSTR_TYPES.B]:
-            rd = self.index_instr(7,11)
-            self.rd = int(rd[::-1],2)
\ No newline at end of file
+            self.rd = self.index_instr(7,11)
+
+R_MNEMONICS = {(0b000, 0b0000000): "ADD", (0b000, 0b0100000): "SUB", (0b111, 0b0000000): "AND",
+               (0b110, 0b0000000): "OR", (0b100, 0b0000000): "XOR"}
+I_MNEMONICS = {0b000: "ADDI", 0b111: "ANDI", 0b110: "ORI", 0b100: "XORI"}
+B_MNEMONICS = {0b000: "BEQ", 0b001: "BNE"}
+
+def disassemble(parsed_instr):
+    # assembler text of a decoded instruction, branch and jump offsets are relative to its PC
+    t = parsed_instr.instr_type
+    if t == INSTR_TYPES.HALT:
+        return "HALT"
+    if t == INSTR_TYPES.R:
+        return "%s x%d, x%d, x%d" % (R_MNEMONICS.get((parsed_instr.funct3, parsed_instr.funct7), "R?"), parsed_instr.rd, parsed_instr.rs1, parsed_instr.rs2)
+    if t == INSTR_TYPES.I:
+        return "%s x%d, x%d, %d" % (I_MNEMONICS.get(parsed_instr.funct3, "I?"), parsed_instr.rd, parsed_instr.rs1, parsed_instr.imm)
+    if t == INSTR_TYPES.LOAD_I:
+        return "LW x%d, %d(x%d)" % (parsed_instr.rd, parsed_instr.imm, parsed_instr.rs1)
+    if t == INSTR_TYPES.S:
+        return "SW x%d, %d(x%d)" % (parsed_instr.rs2, parsed_instr.imm, parsed_instr.rs1)
+    if t == INSTR_TYPES.B:
+        return "%s x%d, x%d, %d" % (B_MNEMONICS.get(parsed_instr.funct3, "B?"), parsed_instr.rs1, parsed_instr.rs2, parsed_instr.imm)
+    return "JAL x%d, %d" % (parsed_instr.rd, parsed_instr.imm)
+
+def format_field(value,bits):
+    if value is None:
+        return value
+    return format(value, '0' + str(bits) + 'b')
@@ -0,0 +1,175 @@
+import mmap
+import struct
+
+WORD = struct.Struct(">i") # memory is Big Endian, same byte order as the text images
+UWORD = struct.Struct(">I")
+
+BYTE_LINES = [format(i,'08b') + "\n" for i in range(256)]
+
+def load_text_image(path):
+    # text images hold one byte per line written as 8 binary digits
+    with open(path) as f:
+        return bytearray(int(line,2) for line in f if line.strip())
+
+def swap_words(data):
+    # reverse the bytes of every 32-bit word, little endian images become this memory's Big Endian
+    data = bytes(data) + bytes(-len(data) % 4)
+    out = bytearray(len(data))
+    out[0::4], out[1::4], out[2::4], out[3::4] = data[3::4], data[2::4], data[1::4], data[0::4]
+    return out
+
+class ByteMemory(object):
+    def __init__(self, data=b"", size=0):
+        # bytearrays and copy-on-write mappings are used in place, anything else is copied
+        if isinstance(data, (bytearray, mmap.mmap)) and len(data) >= size:
+            self.data = data
+        else:
+            self.data = bytearray(data)
+            if len(self.data) < size:
+                self.data.extend(bytes(size - len(self.data)))
+        self.view = memoryview(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def read_word(self, Address):
+        return WORD.unpack_from(self.data, Address)[0]
+
+    def read_uword(self, Address):
+        return UWORD.unpack_from(self.data, Address)[0]
+
+    def write_word(self, Address, WriteData):
+        UWORD.pack_into(self.data, Address, WriteData & 0xFFFFFFFF)
+
+    def dump_lines(self, start=0, end=None):
+        return "".join(map(BYTE_LINES.__getitem__, self.view[start:end]))
+
+    def dump_text(self, path, start=0, end=None):
+        with open(path, "w") as f:
+            f.write(self.dump_lines(start, end))
+
+ADDR_MASK = 0xFFFFFFFF
+PAGE_BITS = 12 # 4 KiB pages
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+ZERO_PAGE = bytes(PAGE_SIZE)
+
+class PagedMemory(object):
+    # sparse 32-bit address space, pages are allocated and zero filled on first write.
+    # backing is a list of (address, data, swap) segments that are only copied into pages when a
+    # page is first read or written, swap marks little endian segments.
+    def __init__(self, data=b"", backing=None):
+        self.pages = {}
+        self.backing = backing or []
+        self.write_bytes(0, data)
+
+    def fault(self, number):
+        # copy whatever the backing segments hold for this page, None if they hold nothing
+        start = number << PAGE_BITS
+        page = None
+        for address, data, swap in self.backing:
+            low, high = max(start, address), min(start + PAGE_SIZE, address + len(data))
+            if low >= high:
+                continue
+            chunk = data[low - address:high - address]
+            if swap:
+                chunk = swap_words(chunk)[:PAGE_SIZE - (low - start)]
+            if page is None:
+                page = self.pages[number] = bytearray(PAGE_SIZE)
+            page[low - start:low - start + len(chunk)] = chunk
+        return page
+
+    def lookup(self, number):
+        page = self.pages.get(number)
+        if page is None and self.backing:
+            page = self.fault(number)
+        return page
+
+    def backing_pages(self):
+        numbers = set()
+        for address, data, swap in self.backing:
+            if len(data):
+                numbers.update(range(address >> PAGE_BITS, ((address + len(data) - 1) >> PAGE_BITS) + 1))
+        return numbers
+
+    def page(self, Address):
+        number = (Address & ADDR_MASK) >> PAGE_BITS
+        page = self.pages.get(number)
+        if page is None:
+            page = self.fault(number) if self.backing else None
+            if page is None:
+                page = self.pages[number] = bytearray(PAGE_SIZE)
+        return page
+
+    def read_bytes(self, Address, size):
+        out = bytearray()
+        while size:
+            Address &= ADDR_MASK
+            offset = Address & PAGE_MASK
+            chunk = min(size, PAGE_SIZE - offset)
+            page = self.lookup(Address >> PAGE_BITS) or ZERO_PAGE
+            out += page[offset:offset+chunk]
+            Address += chunk
+            size -= chunk
+        return bytes(out)
+
+    def write_bytes(self, Address, data):
+        data = memoryview(data)
+        while len(data):
+            Address &= ADDR_MASK
+            offset = Address & PAGE_MASK
+            chunk = min(len(data), PAGE_SIZE - offset)
+            self.page(Address)[offset:offset+chunk] = data[:chunk]
+            Address += chunk
+            data = data[chunk:]
+
+    def read_word(self, Address):
+        Address &= ADDR_MASK
+        offset = Address & PAGE_MASK
+        if offset > PAGE_SIZE - 4:
+            return WORD.unpack(self.read_bytes(Address, 4))[0]
+        page = self.pages.get(Address >> PAGE_BITS)
+        if page is None:
+            page = self.fault(Address >> PAGE_BITS) if self.backing else None
+            if page is None:
+                return 0
+        return WORD.unpack_from(page, offset)[0]
+
+    def read_uword(self, Address):
+        return self.read_word(Address) & 0xFFFFFFFF
+
+    def write_word(self, Address, WriteData):
+        Address &= ADDR_MASK
+        offset = Address & PAGE_MASK
+        if offset > PAGE_SIZE - 4:
+            self.write_bytes(Address, UWORD.pack(WriteData & 0xFFFFFFFF))
+        else:
+            UWORD.pack_into(self.page(Address), offset, WriteData & 0xFFFFFFFF)
+
+    def touched_pages(self):
+        # pages of the backing image count as touched whether or not they were faulted in yet
+        return sorted(set(self.pages) | self.backing_pages())
+
+    def dump_lines(self, start, end):
+        lines = []
+        Address = start
+        while Address < end:
+            offset = Address & PAGE_MASK
+            chunk = min(end - Address, PAGE_SIZE - offset)
+            page = self.lookup(Address >> PAGE_BITS) or ZERO_PAGE
+            lines.extend(map(BYTE_LINES.__getitem__, page[offset:offset+chunk]))
+            Address += chunk
+        return "".join(lines)
+
+    def dump_text(self, path, start, end):
+        with open(path, "w") as f:
+            f.write(self.dump_lines(start, end))
+
+    def dump_touched_text(self, path, numbers=None):
+        # every touched page behind an "@address" line, the same layout $readmemb accepts
+        if numbers is None:
+            numbers = self.touched_pages()
+        with open(path, "w") as f:
+            for number in numbers:
+                f.write("@%08x\n" % (number << PAGE_BITS))
+                f.write("".join(map(BYTE_LINES.__getitem__, self.lookup(number) or ZERO_PAGE)))
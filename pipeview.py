@@ -0,0 +1,202 @@
+from instruction import disassemble
+
+# Per-instruction pipeline timelines of the five stage core, for Konata or gem5's O3PipeView tools.
+# FiveStageCore calls the PipeView hooks from its stage handlers, PipeView follows every instruction
+# from fetch to retirement and streams the stage changes to a writer, so only instructions in flight
+# are held in memory.
+# Stages: F fetch, D decode, Ds decode stalled on a load-use hazard, Dm decode held for a misprediction
+# penalty, X execute, M memory, Ms memory stalled on a data cache miss, W writeback. Instructions
+# dropped from ID when the core is drained end as flushes.
+
+PIPEVIEW_FORMATS = ("konata", "o3")
+TICKS_PER_CYCLE = 1000 # O3PipeView timestamps are in ticks
+
+class PipeRecord(object):
+    __slots__ = ("id", "pc", "text", "stage", "stages", "store")
+
+    def __init__(self, id, pc, text):
+        self.id = id
+        self.pc = pc
+        self.text = text
+        self.stage = None # current stage name
+        self.stages = {} # stage name -> first cycle in it
+        self.store = None # cycle of the data memory write
+
+class PipeView(object):
+    def __init__(self, core, writer):
+        self.core = core
+        self.writer = writer
+        self.next_id = 0
+        self.decode = None # fetched, waiting in or going through ID
+        self.ex = None # issued, executes next
+        self.mem = None
+        self.wb = None
+        self.refetch = False # IF fetches the stalled instruction again, it is not a new one
+
+    def enter(self, rec, stage):
+        cycle = self.core.cycle
+        if rec.stage != stage:
+            rec.stage = stage
+            rec.stages.setdefault(stage, cycle)
+            self.writer.stage(rec, stage, cycle)
+
+    def finish(self, rec, flushed=False, reason=None):
+        if reason is not None:
+            self.writer.note(rec, reason)
+        self.writer.end(rec, self.core.cycle + 1, flushed) # leaves at the end of this cycle
+
+    # IF
+    def fetch(self, pc):
+        if self.refetch:
+            self.refetch = False
+            return
+        rec = PipeRecord(self.next_id, pc, disassemble(self.core.ext_imem.decodeInstr(pc)))
+        self.next_id += 1
+        self.writer.begin(rec, self.core.cycle)
+        self.enter(rec, "F")
+        self.decode = rec
+
+    # ID
+    def stall(self):
+        if self.decode is not None:
+            self.enter(self.decode, "Ds")
+            self.writer.note(self.decode, "load-use stall at cycle %d" % self.core.cycle)
+            self.refetch = True
+
+    def issue(self):
+        rec, self.decode = self.decode, None
+        if rec is not None:
+            self.enter(rec, "D")
+            self.ex = rec
+
+    def retire_issued(self):
+        # HALT, taken branches and jumps leave the pipeline from ID
+        rec, self.decode = self.decode, None
+        if rec is not None:
+            self.enter(rec, "D")
+            self.finish(rec)
+
+    def mispredict(self):
+        # the fetch after a misprediction waits in ID until the penalty is paid
+        if self.decode is not None:
+            if self.decode.stage != "Dm":
+                self.writer.note(self.decode, "misprediction penalty from cycle %d" % self.core.cycle)
+            self.enter(self.decode, "Dm")
+
+    def flush(self, reason):
+        rec, self.decode = self.decode, None
+        if rec is not None:
+            self.enter(rec, "D")
+            self.finish(rec, True, reason)
+
+    # EX, MEM, WB
+    def execute(self):
+        rec, self.ex = self.ex, None
+        if rec is not None:
+            self.enter(rec, "X")
+            self.mem = rec
+
+    def memory(self, store):
+        rec, self.mem = self.mem, None
+        if rec is not None:
+            self.enter(rec, "M")
+            if store:
+                rec.store = self.core.cycle
+            self.wb = rec
+
+    def memory_stall(self):
+        # every stage is frozen, the instruction that missed waits in MEM
+        if self.wb is not None:
+            if self.wb.stage != "Ms":
+                self.writer.note(self.wb, "data cache miss at cycle %d" % self.core.cycle)
+            self.enter(self.wb, "Ms")
+
+    def writeback(self):
+        rec, self.wb = self.wb, None
+        if rec is not None:
+            self.enter(rec, "W")
+            self.finish(rec)
+
+    def close(self):
+        self.writer.close()
+
+class KonataWriter(object):
+    # Kanata log format version 0004, read by the Konata pipeline viewer
+    def __init__(self, f):
+        self.f = f
+        self.cycle = 0
+        self.leaving = [] # retire/flush lines for the end of the current cycle
+        self.retired = 0
+        f.write("Kanata\t0004\nC=\t0\n")
+
+    def at(self, cycle):
+        if cycle <= self.cycle:
+            return
+        self.f.write("C\t1\n")
+        self.cycle += 1
+        if self.leaving:
+            self.f.writelines(self.leaving)
+            self.leaving = []
+        if cycle > self.cycle:
+            self.f.write("C\t%d\n" % (cycle - self.cycle))
+            self.cycle = cycle
+
+    def begin(self, rec, cycle):
+        self.at(cycle)
+        self.f.write("I\t%d\t%d\t0\nL\t%d\t0\t%08x: %s\n" % (rec.id, rec.id, rec.id, rec.pc, rec.text))
+
+    def stage(self, rec, stage, cycle):
+        self.at(cycle)
+        self.f.write("S\t%d\t0\t%s\n" % (rec.id, stage))
+
+    def note(self, rec, text):
+        self.f.write("L\t%d\t1\t%s\n" % (rec.id, text))
+
+    def end(self, rec, cycle, flushed):
+        if flushed:
+            self.leaving.append("R\t%d\t0\t1\n" % rec.id)
+        else:
+            self.leaving.append("R\t%d\t%d\t0\n" % (rec.id, self.retired))
+            self.retired += 1
+
+    def close(self):
+        self.at(self.cycle + 1)
+        self.f.close()
+
+class O3PipeViewWriter(object):
+    # gem5 O3PipeView trace lines, one block per instruction written when it leaves the pipeline.
+    # The five stages map onto fetch, decode/rename/dispatch, issue, complete and retire, a tick of 0
+    # marks a stage the instruction never reached.
+    def __init__(self, f):
+        self.f = f
+
+    def begin(self, rec, cycle):
+        pass
+
+    def stage(self, rec, stage, cycle):
+        pass
+
+    def note(self, rec, text):
+        pass
+
+    def end(self, rec, cycle, flushed):
+        def tick(*stages):
+            for stage in stages:
+                if stage in rec.stages:
+                    return rec.stages[stage] * TICKS_PER_CYCLE
+            return 0
+        decode = tick("Ds", "Dm", "D")
+        self.f.write("O3PipeView:fetch:%d:0x%08x:0:%d:%s\n" % (tick("F"), rec.pc, rec.id, rec.text))
+        self.f.write("O3PipeView:decode:%d\nO3PipeView:rename:%d\nO3PipeView:dispatch:%d\n" % (decode, decode, tick("D")))
+        self.f.write("O3PipeView:issue:%d\nO3PipeView:complete:%d\n" % (tick("X"), tick("M")))
+        store = rec.store * TICKS_PER_CYCLE if rec.store is not None else 0
+        self.f.write("O3PipeView:retire:%d:store:%d\n" % (0 if flushed else cycle * TICKS_PER_CYCLE, store))
+
+    def close(self):
+        self.f.close()
+
+def open_pipeview(path, format="konata"):
+    if format not in PIPEVIEW_FORMATS:
+        raise ValueError("unknown pipeline view format " + repr(format))
+    f = open(path, "w", buffering=1 << 20)
+    return KonataWriter(f) if format == "konata" else O3PipeViewWriter(f)
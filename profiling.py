@@ -0,0 +1,43 @@
+import time
+
+PROFILED_METHODS = ("step", "handle_WB", "handle_MEM", "handle_EX", "handle_ID", "handle_IF", "printState")
+
+class StageProfiler(object):
+    def __init__(self):
+        self.times = {} # method name -> host nanoseconds
+        self.calls = {} # method name -> number of calls
+
+    def wrap(self, name, method):
+        perf_counter_ns = time.perf_counter_ns
+        times, calls = self.times, self.calls
+        times[name] = 0
+        calls[name] = 0
+
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[name] += perf_counter_ns() - start
+                calls[name] += 1
+        return timed
+
+def instrument(core, profiler=None):
+    # the timed wrappers are set on this instance only, cores that are not instrumented pay nothing
+    if profiler is None:
+        profiler = StageProfiler()
+    for name in PROFILED_METHODS:
+        if hasattr(core, name):
+            setattr(core, name, profiler.wrap(name, getattr(core, name)))
+    core.myRF.outputRF = profiler.wrap("outputRF", core.myRF.outputRF)
+    return profiler
+
+def format_report(title, profiler, core):
+    cycles = max(core.cycle, 1)
+    lines = [title + " host time per simulated cycle-----------------------------\n"]
+    for name in sorted(profiler.times, key=profiler.times.get, reverse=True):
+        lines.append("%-12s %12.0f ns/cycle %10d calls\n" % (name, profiler.times[name] / cycles, profiler.calls[name]))
+    step_seconds = profiler.times.get("step", 0) / 1e9
+    if step_seconds:
+        lines.append("Simulated instructions per host second: %.0f\n" % (core.stats.instructions / step_seconds))
+    return "".join(lines)
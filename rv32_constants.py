@@ -13,13 +13,13 @@ class INSTR_TYPES_CLASS:
 INSTR_TYPES = INSTR_TYPES_CLASS()
 
 OPCODE_TO_INSTR_TYPE = {
-    "0110011":INSTR_TYPES.R,
-    "0010011":INSTR_TYPES.I,
-    "0000011":INSTR_TYPES.LOAD_I,
-    "1101111":INSTR_TYPES.J,
-    "1100011":INSTR_TYPES.B,
-    "0100011":INSTR_TYPES.S,
-    "1111111":INSTR_TYPES.HALT
+    0b0110011:INSTR_TYPES.R,
+    0b0010011:INSTR_TYPES.I,
+    0b0000011:INSTR_TYPES.LOAD_I,
+    0b1101111:INSTR_TYPES.J,
+    0b1100011:INSTR_TYPES.B,
+    0b0100011:INSTR_TYPES.S,
+    0b1111111:INSTR_TYPES.HALT
 }
 
 INSTR_TYPE_TO_CONTROL = {
@@ -0,0 +1,128 @@
+import os
+import math
+import time
+import argparse
+import statistics
+from core import InsMem, DataMem
+from translator import TranslatingCore
+from NYU_RV32I_6913 import FiveStageCore
+from tracing import Tracer, TRACE_OFF
+from cache import parse_cache_spec, build_hierarchy
+from branch_predictor import PREDICTORS, FetchPredictor
+
+Z_SCORES = {0.90: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+class Sample(object):
+    def __init__(self, start_instruction, cycles, instructions):
+        self.start_instruction = start_instruction # dynamic instruction count when the window began
+        self.cycles = cycles
+        self.instructions = instructions
+
+    def cpi(self):
+        return self.cycles / self.instructions
+
+class SampledRun(object):
+    def __init__(self, core, samples, instructions, halted, confidence):
+        self.core = core # functional core holding the final architectural state
+        self.samples = samples
+        self.instructions = instructions
+        self.halted = halted
+        self.confidence = confidence
+
+    def cpi(self):
+        return statistics.mean(sample.cpi() for sample in self.samples)
+
+    def cpi_interval(self):
+        # normal approximation over the per-window CPIs
+        if len(self.samples) < 2:
+            return (self.cpi(), self.cpi())
+        half = Z_SCORES[self.confidence] * statistics.stdev(sample.cpi() for sample in self.samples) / math.sqrt(len(self.samples))
+        return (self.cpi() - half, self.cpi() + half)
+
+    def ipc_interval(self):
+        low, high = self.cpi_interval()
+        return (1 / high, 1 / low if low > 0 else float("inf"))
+
+    def estimated_cycles(self):
+        return self.cpi() * self.instructions
+
+def run_detailed(fsCore, cycles):
+    start = fsCore.cycle
+    while not fsCore.halted and fsCore.cycle - start < cycles:
+        fsCore.step()
+
+def run_sampled(ioDir, interval=100000, warmup=1000, window=10000, maxInstructions=None, confidence=0.95, dcache=None, predictor=None):
+    # fast-forward `interval` instructions functionally, then hand the architectural state to a
+    # FiveStageCore, run `warmup` cycles unmeasured and `window` cycles measured, drain the pipeline
+    # and hand the state back. A data cache or branch predictor keeps its contents across windows,
+    # only the detailed cycles train it
+    imem = InsMem("Imem", ioDir)
+    dmem = DataMem("SP", ioDir)
+    tracer = Tracer(TRACE_OFF)
+    functional = TranslatingCore(ioDir, imem, dmem, tracer)
+    detailedInstructions = 0
+    samples = []
+
+    while not functional.halted:
+        budget = interval
+        if maxInstructions is not None:
+            budget = min(budget, maxInstructions - functional.instructions - detailedInstructions)
+            if budget <= 0:
+                break
+        functional.run(budget)
+        if functional.halted:
+            break
+
+        fsCore = FiveStageCore(ioDir, imem, dmem, tracer)
+        fsCore.dcache = dcache
+        fsCore.predictor = predictor
+        fsCore.load_architectural_state(functional.architectural_pc(), functional.myRF.Registers)
+        run_detailed(fsCore, warmup)
+        cycles, instructions = fsCore.cycle, fsCore.stats.instructions
+        run_detailed(fsCore, window)
+        if fsCore.stats.instructions > instructions:
+            samples.append(Sample(functional.instructions + detailedInstructions + instructions,
+                                  fsCore.cycle - cycles, fsCore.stats.instructions - instructions))
+
+        fsCore.drain()
+        while not fsCore.halted:
+            fsCore.step()
+        detailedInstructions += fsCore.stats.instructions
+
+        if fsCore.resume_pc is None: # the program itself halted inside the detailed window
+            functional.load_architectural_state(fsCore.state.IF.PC, fsCore.myRF.Registers)
+            functional.halted = True
+            break
+        functional.load_architectural_state(fsCore.architectural_pc(), fsCore.myRF.Registers)
+
+    return SampledRun(functional, samples, functional.instructions + detailedInstructions, functional.halted, confidence)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sampled RV32I simulation: functional fast-forward with detailed five stage windows')
+    parser.add_argument('--iodir', default="", type=str, help='Directory containing the input files.')
+    parser.add_argument('--interval', default=100000, type=int, help='Instructions fast-forwarded between detailed windows.')
+    parser.add_argument('--warmup', default=1000, type=int, help='Unmeasured five stage cycles before each window.')
+    parser.add_argument('--window', default=10000, type=int, help='Measured five stage cycles per window.')
+    parser.add_argument('--max-instructions', default=None, type=int, help='Stop after roughly this many instructions.')
+    parser.add_argument('--dcache', default=[], action='append', type=parse_cache_spec, help='Data cache level for the detailed windows, see NYU_RV32I_6913.py --dcache.')
+    parser.add_argument('--branch-predictor', default="none", choices=PREDICTORS, help='Branch predictor for the detailed windows, see NYU_RV32I_6913.py --branch-predictor.')
+    parser.add_argument('--confidence', default=0.95, type=float, choices=sorted(Z_SCORES), help='Confidence level of the reported intervals.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir)
+    print("IO Directory:", ioDir)
+    start = time.perf_counter()
+    predictor = FetchPredictor(args.branch_predictor) if args.branch_predictor != "none" else None
+    run = run_sampled(ioDir, args.interval, args.warmup, args.window, args.max_instructions, args.confidence,
+                      build_hierarchy(args.dcache) if args.dcache else None, predictor)
+    elapsed = time.perf_counter() - start
+
+    print("Instructions executed:", run.instructions, "(halted)" if run.halted else "(instruction limit reached)")
+    print("Detailed windows:", len(run.samples))
+    if run.samples:
+        low, high = run.cpi_interval()
+        ipcLow, ipcHigh = run.ipc_interval()
+        print("Cycles per instruction: %g (%g%% interval %g - %g)" % (run.cpi(), 100*args.confidence, low, high))
+        print("Instructions per cycle: %g (%g%% interval %g - %g)" % (1 / run.cpi(), 100*args.confidence, ipcLow, ipcHigh))
+        print("Estimated cycles: %d" % run.estimated_cycles())
+    print("Host time: %.3fs" % elapsed)
@@ -0,0 +1,51 @@
+import os
+import json
+
+class CoreStats(object):
+    def __init__(self):
+        self.cycles = 0
+        self.instructions = 0 # dynamic instructions, HALT included
+        self.load_use_stalls = 0
+        self.branch_flushes = 0
+        self.jump_flushes = 0
+        self.branches = 0 # conditional branches resolved, flushes above are the mispredicted ones
+        self.jumps = 0
+        self.mispredict_cycles = 0 # fetch cycles squashed after mispredictions
+        self.forward_ex_mem = 0 # operands forwarded from the EX/MEM latch (forwarding value 0b10)
+        self.forward_mem_wb = 0 # operands forwarded from the MEM/WB latch (forwarding value 0b01)
+        self.bubbles = {"EX": 0, "MEM": 0, "WB": 0}
+        self.memory_stall_cycles = 0 # cycles the pipeline waited on data cache misses
+
+    def cpi(self):
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+    def ipc(self):
+        return self.instructions / self.cycles if self.cycles else 0.0
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        stats["bubbles"] = dict(self.bubbles)
+        stats["cpi"] = self.cpi()
+        stats["ipc"] = self.ipc()
+        return stats
+
+def format_metrics(title, stats):
+    return [
+        title + " Core Performance Metrics-----------------------------\n",
+        "Number of cycles taken: " + str(stats.cycles) + "\n",
+        "Cycles per instruction: " + "%g" % stats.cpi() + "\n",
+        "Instructions per cycle: " + "%g" % stats.ipc() + "\n",
+    ]
+
+def write_performance_metrics(ioDir, ssStats, fsStats):
+    resPath = os.path.join(ioDir, "PerformanceMetrics_Result.txt")
+    with open(resPath, "w") as rp:
+        rp.write("IO Directory: " + ioDir + "\n")
+        rp.writelines(format_metrics("Single Stage", ssStats))
+        rp.write("\n")
+        rp.writelines(format_metrics("Five Stage", fsStats))
+    return resPath
+
+def write_stats_json(path, **stats):
+    with open(path, "w") as f:
+        json.dump(dict((name, core_stats.as_dict()) for name, core_stats in stats.items()), f, indent=2)
@@ -0,0 +1,39 @@
+import os
+import sys
+import struct
+import shutil
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT) # the simulator modules live at the top level of the repository
+
+TEST_CASES = ["TC0", "TC1", "TC2", "TC3", "TC4"]
+
+# encoders for the few instructions the hand written test programs use
+HALT = 0xFFFFFFFF
+
+def addi(rd, rs1, imm):
+    return (imm & 0xFFF) << 20 | rs1 << 15 | rd << 7 | 0x13
+
+def lw(rd, rs1, imm):
+    return (imm & 0xFFF) << 20 | rs1 << 15 | 0b010 << 12 | rd << 7 | 0x03
+
+def bne(rs1, rs2, imm):
+    imm &= 0x1FFF
+    return ((imm >> 12) << 31 | ((imm >> 5) & 0x3F) << 25 | rs2 << 20 | rs1 << 15 | 0b001 << 12 |
+            ((imm >> 1) & 0xF) << 8 | ((imm >> 11) & 1) << 7 | 0x63)
+
+def image(*words):
+    # instruction memory bytes, Big Endian words like imem.txt
+    return bytearray(b"".join(struct.pack(">I", word) for word in words))
+
+@pytest.fixture
+def copy_case(tmp_path):
+    # copies the inputs of a test case into a fresh directory so runs never touch the checked in results
+    def copy(name):
+        ioDir = tmp_path / name
+        ioDir.mkdir()
+        for image in ("imem.txt", "dmem.txt"):
+            shutil.copy(os.path.join(ROOT, name, image), str(ioDir))
+        return str(ioDir)
+    return copy
@@ -0,0 +1,13 @@
+import pytest
+from api import simulate, CORES
+from conftest import addi, image
+
+@pytest.mark.parametrize("core", sorted(CORES))
+def test_empty_program_is_rejected(core):
+    with pytest.raises(ValueError):
+        simulate(b"", core=core)
+
+@pytest.mark.parametrize("core", sorted(CORES))
+def test_running_off_the_program_raises_index_error(core):
+    with pytest.raises(IndexError):
+        simulate(image(addi(1, 0, 1)), core=core)
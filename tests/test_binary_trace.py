@@ -0,0 +1,32 @@
+import os
+import shutil
+import pytest
+from NYU_RV32I_6913 import run_simulation
+from binary_trace import BinaryTracer, convert
+from tracing import Tracer
+from conftest import TEST_CASES
+
+TRACES = ["StateResult_SS.txt", "StateResult_FS.txt", "SS_RFResult.txt", "FS_RFResult.txt"]
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+@pytest.mark.parametrize("case", TEST_CASES)
+def test_binary_trace_converts_back_to_the_text_trace(case, copy_case, tmp_path):
+    textDir = copy_case(case)
+    run_simulation(textDir, Tracer())
+
+    binaryDir = str(tmp_path / "binary")
+    os.mkdir(binaryDir)
+    for image in ("imem.txt", "dmem.txt"):
+        shutil.copy(os.path.join(textDir, image), binaryDir)
+    run_simulation(binaryDir, BinaryTracer())
+    assert not any(os.path.exists(os.path.join(binaryDir, name)) for name in TRACES)
+
+    outDir = str(tmp_path / "converted")
+    os.mkdir(outDir)
+    for core in ("SS", "FS"):
+        convert(os.path.join(binaryDir, core + "_Trace.bin"), outDir)
+    for name in TRACES:
+        assert read(os.path.join(outDir, name)) == read(os.path.join(textDir, name)), name
@@ -0,0 +1,12 @@
+import pytest
+from cache import Cache
+
+@pytest.mark.parametrize("geometry", [
+    dict(size=64, line_size=16, associativity=0),
+    dict(size=64, line_size=0, associativity=1),
+    dict(size=0, line_size=16, associativity=1),
+    dict(size=64, line_size=16, associativity=-1),
+])
+def test_non_positive_geometry_is_rejected(geometry):
+    with pytest.raises(ValueError, match="L2D"):
+        Cache(name="L2D", **geometry)
@@ -0,0 +1,70 @@
+import pytest
+from core import InsMem, DataMem
+from NYU_RV32I_6913 import FiveStageCore
+from cache import build_hierarchy, parse_cache_spec
+from branch_predictor import FetchPredictor
+from checkpoint import save_checkpoint, load_checkpoint
+from tracing import Tracer, TRACE_OFF
+
+CONFIGS = {
+    "plain": (None, None),
+    "dcache": (["size=32,line=4,latency=7", "size=128,line=16,ways=2,policy=random,latency=20"], None),
+    "predictor": (None, ("2bit", 3)),
+    "dcache+gshare": (["size=32,line=4,ways=2,policy=fifo,write=through,latency=5"], ("gshare", 2)),
+}
+
+def make_core(ioDir, config):
+    cacheSpecs, predictor = CONFIGS[config]
+    core = FiveStageCore(ioDir, InsMem("Imem", ioDir), DataMem("FS", ioDir), Tracer(TRACE_OFF))
+    if cacheSpecs is not None:
+        core.dcache = build_hierarchy([parse_cache_spec(spec) for spec in cacheSpecs])
+    if predictor is not None:
+        core.predictor = FetchPredictor(predictor[0], mispredict_penalty=predictor[1])
+    return core
+
+def run(core, until=None):
+    while not core.halted and (until is None or core.cycle < until) and core.cycle < 10000:
+        core.step()
+
+def snapshot(core):
+    memory = core.ext_dmem.DMem
+    return {
+        "cycle": core.cycle,
+        "registers": list(core.myRF.Registers),
+        "state": FiveStageCore.format_state(core.state, 0),
+        "buffer": FiveStageCore.format_state(core.buffer, 0),
+        "stats": core.stats.as_dict(),
+        "memory": dict((number, memory.read_bytes(number << 12, 4096)) for number in memory.touched_pages()),
+        "dcache": [level.as_dict() for level in core.dcache.levels()] if core.dcache is not None else None,
+        "predictor": core.predictor.as_dict() if core.predictor is not None else None,
+    }
+
+@pytest.mark.parametrize("config", sorted(CONFIGS))
+@pytest.mark.parametrize("case", ["TC1", "TC4"])
+def test_restored_run_finishes_identically(case, config, copy_case, tmp_path):
+    ioDir = copy_case(case)
+    reference = make_core(ioDir, config)
+    run(reference)
+    assert reference.halted
+    expected = snapshot(reference)
+
+    path = str(tmp_path / "FS_Checkpoint.bin")
+    for at in range(1, reference.cycle):
+        # every cycle, so checkpoints land inside load-use stalls, squashes and cache misses
+        core = make_core(ioDir, config)
+        run(core, at)
+        save_checkpoint(core, path)
+        restored = make_core(ioDir, config)
+        load_checkpoint(restored, path)
+        run(restored)
+        assert snapshot(restored) == expected, "checkpoint at cycle %d" % at
+
+@pytest.mark.parametrize("saved, restored", [("dcache", "plain"), ("plain", "dcache"), ("predictor", "plain"), ("predictor", "dcache+gshare")])
+def test_restore_into_a_differently_configured_core_fails(saved, restored, copy_case, tmp_path):
+    ioDir = copy_case("TC4")
+    core = make_core(ioDir, saved)
+    run(core, 10)
+    path = str(tmp_path / "FS_Checkpoint.bin")
+    save_checkpoint(core, path)
+    with pytest.raises(ValueError):
+        load_checkpoint(make_core(ioDir, restored), path)
@@ -0,0 +1,47 @@
+import pytest
+from core import InsMem, DataMem
+from functional import FunctionalCore
+from translator import TranslatingCore
+from tracing import Tracer, TRACE_OFF
+from conftest import HALT, addi, image
+
+def test_write_invalidates_decoded_instruction():
+    imem = InsMem("Imem", "", image(addi(1, 0, 1), HALT))
+    assert imem.decodeInstr(0).imm == 1
+    imem.writeInstr(0, addi(1, 0, 7))
+    assert imem.decodeInstr(0).imm == 7
+
+def test_write_notifies_listeners():
+    imem = InsMem("Imem", "", image(addi(1, 0, 1), HALT))
+    written = []
+    imem.listeners.append(written.append)
+    imem.writeInstr(4, addi(2, 0, 2))
+    assert written == [4]
+
+def run_after_rewrite(coreClass):
+    # runs once to fill the core's caches, rewrites the first instruction and runs again from 0
+    imem = InsMem("Imem", "", image(addi(1, 0, 1), HALT))
+    core = coreClass("", imem, DataMem("FN", "", image=bytearray(8)), Tracer(TRACE_OFF))
+    core.run()
+    assert core.myRF.Registers[1] == 1
+    imem.writeInstr(0, addi(1, 0, 7))
+    core.load_architectural_state(0, [0]*32)
+    core.run()
+    return core.myRF.Registers[1]
+
+def test_functional_core_sees_rewritten_code():
+    assert run_after_rewrite(FunctionalCore) == 7
+
+def test_translated_blocks_are_dropped_on_write():
+    assert run_after_rewrite(TranslatingCore) == 7
+
+def test_access_outside_image_is_rejected():
+    # the image of an ELF starts at its text base, nothing below it or past its end may alias it
+    imem = InsMem("Imem", "", image(addi(1, 0, 1), HALT), entry=0x100, base=0x100)
+    assert imem.readInstr(0x104) == HALT
+    for address in (0xfc, 0x108):
+        with pytest.raises(IndexError):
+            imem.readInstr(address)
+        with pytest.raises(IndexError):
+            imem.writeInstr(address, 0)
+    assert imem.readInstr(0x104) == HALT
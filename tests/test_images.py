@@ -0,0 +1,33 @@
+import os
+import sys
+import struct
+import subprocess
+from core import InsMem, DataMem
+from functional import FunctionalCore
+from tracing import Tracer, TRACE_OFF
+from memory import load_text_image
+from conftest import ROOT, HALT, lw
+
+CONSTANT = 0x12345678
+
+def write_elf(path, base, words):
+    # one R+X PT_LOAD segment, the layout GNU ld gives .text and .rodata by default
+    body = b"".join(struct.pack("<I", word) for word in words)
+    header = struct.pack("<16sHHIIIIIHHHHHH", b"\x7fELF\x01\x01\x01" + bytes(9), 2, 243, 1, base, 52, 0, 0, 52, 32, 1, 40, 0, 0)
+    segment = struct.pack("<IIIIIIII", 1, 84, base, base, len(body), len(body), 5, 4)
+    with open(path, "wb") as f:
+        f.write(header + segment + body)
+
+def test_loads_read_constants_in_the_text_segment(tmp_path):
+    write_elf(str(tmp_path / "program.elf"), 0x100, [lw(1, 0, 0x108), HALT, CONSTANT])
+    ioDir = str(tmp_path)
+    core = FunctionalCore(ioDir, InsMem("Imem", ioDir), DataMem("FN", ioDir), Tracer(TRACE_OFF))
+    core.run(10)
+    assert core.halted
+    assert core.myRF.Registers[1] == CONSTANT
+
+def test_from_elf_dmem_holds_the_text_segment(tmp_path):
+    write_elf(str(tmp_path / "program.elf"), 0x100, [lw(1, 0, 0x108), HALT, CONSTANT])
+    subprocess.check_call([sys.executable, os.path.join(ROOT, "images.py"), "from-elf", str(tmp_path / "program.elf"), str(tmp_path / "out")])
+    dmem = load_text_image(str(tmp_path / "out" / "dmem.txt"))
+    assert bytes(dmem[0x108:0x10c]) == struct.pack(">I", CONSTANT)
@@ -0,0 +1,38 @@
+import pytest
+from core import InsMem, DataMem
+from functional import FunctionalCore
+from translator import TranslatingCore
+from tracing import Tracer, TRACE_OFF
+from conftest import TEST_CASES, HALT, addi, bne, image
+
+def final_state(coreClass, ioDir):
+    core = coreClass(ioDir, InsMem("Imem", ioDir), DataMem("FN", ioDir), Tracer(TRACE_OFF))
+    core.run(100000)
+    memory = core.ext_dmem.DMem
+    pages = dict((number, memory.read_bytes(number << 12, 4096)) for number in memory.touched_pages())
+    return core.halted, core.instructions, core.pc, list(core.myRF.Registers), pages
+
+@pytest.mark.parametrize("case", TEST_CASES)
+def test_translated_run_matches_functional(case, copy_case):
+    ioDir = copy_case(case)
+    functional = final_state(FunctionalCore, ioDir)
+    assert functional[0] # every test case halts
+    assert final_state(TranslatingCore, ioDir) == functional
+
+COUNTED_LOOP = [addi(2, 0, 100), addi(1, 1, 1), bne(1, 2, -4), HALT]
+
+@pytest.mark.parametrize("limit", [1, 7, 64, None])
+def test_translated_loop_respects_instruction_limits(limit):
+    # a block that branches back to itself loops inside the translated function, the budget must
+    # still stop it at exactly the same instruction as the functional core
+    program = image(*COUNTED_LOOP)
+    runs = []
+    for coreClass in (FunctionalCore, TranslatingCore):
+        core = coreClass("", InsMem("Imem", "", program), DataMem("FN", "", image=bytearray(4)), Tracer(TRACE_OFF))
+        states = []
+        while not core.halted:
+            core.run(limit)
+            states.append((core.instructions, core.pc, list(core.myRF.Registers)))
+        runs.append(states)
+    assert runs[0] == runs[1]
+    assert runs[0][-1][2][1] == 100
@@ -0,0 +1,187 @@
+import os
+import bisect
+import argparse
+from tracing import CycleIndex, INDEX_MAGIC, INDEX_VERSION, INDEX_HEADER, parse_cycle_range
+from utils import sign_extend
+
+# Random access into text traces (StateResult_SS/FS.txt, SS/FS_RFResult.txt) through the
+# <trace>.idx sidecar the tracer writes with --trace-index. Traces without one, or with one that no
+# longer matches the file size, are indexed in a single streaming pass on first use.
+
+HEADERS = (b"State after executing cycle:", b"State of RF after executing cycle:", b"@")
+SEPARATOR = b"-"*70
+
+def cycle_of(line):
+    # cycle number of a record header line, None for any other line
+    if line.startswith(HEADERS[2]):
+        return int(line[1:])
+    for header in HEADERS[:2]:
+        if line.startswith(header):
+            return int(line[len(header):])
+    return None
+
+def build_index(path):
+    index = CycleIndex()
+    with open(path, "rb") as f:
+        offset = 0
+        separator = None # offset of a preceding SingleStageCore separator line, records start there
+        for line in f:
+            if line.startswith(SEPARATOR):
+                separator = offset
+            else:
+                cycle = cycle_of(line)
+                if cycle is not None:
+                    index.cycles.append(cycle)
+                    index.offsets.append(offset if separator is None else separator)
+                separator = None
+            offset += len(line)
+        index.size = offset
+    return index
+
+def load_index(path):
+    # the saved index of a trace, None if it is missing or stale
+    try:
+        with open(path + ".idx", "rb") as f:
+            magic, version, size, count = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if magic != INDEX_MAGIC or version != INDEX_VERSION or size != os.path.getsize(path):
+                return None
+            index = CycleIndex()
+            index.cycles.frombytes(f.read(count * index.cycles.itemsize))
+            index.offsets.frombytes(f.read(count * index.offsets.itemsize))
+            index.size = size
+            return index
+    except (OSError, ValueError):
+        return None
+
+class IndexedTrace(object):
+    def __init__(self, path, save=True):
+        self.path = path
+        index = load_index(path)
+        if index is None:
+            index = build_index(path)
+            if save:
+                index.save(path + ".idx")
+        self.cycles = index.cycles
+        self.offsets = index.offsets
+        self.size = index.size
+        # traces normally hold every cycle of a range, then a cycle is its own position in the index
+        self.dense = len(self.cycles) > 0 and self.cycles[-1] - self.cycles[0] + 1 == len(self.cycles)
+
+    def position(self, cycle):
+        if self.dense:
+            position = cycle - self.cycles[0]
+            return position if 0 <= position < len(self.cycles) else None
+        position = bisect.bisect_left(self.cycles, cycle)
+        if position < len(self.cycles) and self.cycles[position] == cycle:
+            return position
+        return None
+
+    def read(self, first, last):
+        # text of records first..last (positions in the index), one seek and one read
+        end = self.offsets[last + 1] if last + 1 < len(self.offsets) else self.size
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[first])
+            return f.read(end - self.offsets[first]).decode()
+
+    def record(self, cycle):
+        # lines of the record for cycle, None if the trace does not hold it
+        position = self.position(cycle)
+        if position is None:
+            return None
+        return self.read(position, position).splitlines(True)
+
+    def records(self, first, last):
+        # (cycle, lines) for every traced cycle in first..last
+        low = bisect.bisect_left(self.cycles, first)
+        high = bisect.bisect_right(self.cycles, last) - 1
+        if low > high:
+            return []
+        text = self.read(low, high)
+        bounds = [offset - self.offsets[low] for offset in self.offsets[low:high+1]] + [len(text)]
+        return [(self.cycles[low+i], text[bounds[i]:bounds[i+1]].splitlines(True)) for i in range(high - low + 1)]
+
+def parse_cycles(text):
+    # a single cycle N, or a FIRST:LAST range
+    if ":" not in text:
+        return int(text), int(text)
+    return parse_cycle_range(text)
+
+def parse_rf(lines):
+    # register values of a full RF record, as signed ints
+    return [sign_extend(int(line, 2), 32) for line in lines[1:33]]
+
+def parse_state(lines):
+    # {"IF.PC": "4", ...} of a state record, values exactly as dumped
+    state = {}
+    for line in lines:
+        key, sep, val = line.rstrip("\n").partition(": ")
+        if sep and "." in key:
+            state[key] = val
+    return state
+
+class TraceQuery(object):
+    # pipeline state and register file of one core, SS or FS, looked up by cycle
+    def __init__(self, ioDir, core="FS"):
+        self.state = IndexedTrace(os.path.join(ioDir, "StateResult_" + core + ".txt"))
+        rfPath = os.path.join(ioDir, core + "_RFResult.txt")
+        if not os.path.exists(rfPath) and os.path.exists(os.path.join(ioDir, core + "_RFDelta.txt")):
+            raise ValueError("delta RF dumps only replay from the start, expand them with delta_dump.py first")
+        self.rf = IndexedTrace(rfPath)
+
+    def at(self, cycle):
+        # (state lines, RF lines) after cycle, either is None when that cycle was not traced
+        return self.state.record(cycle), self.rf.record(cycle)
+
+    def between(self, first, last):
+        rfs = dict(self.rf.records(first, last))
+        return [(cycle, lines, rfs.get(cycle)) for cycle, lines in self.state.records(first, last)]
+
+    def state_at(self, cycle):
+        # {"IF.PC": "4", ...} after cycle, None when it was not traced
+        lines = self.state.record(cycle)
+        return parse_state(lines) if lines is not None else None
+
+    def registers_at(self, cycle):
+        # the 32 registers after cycle as signed ints, None when they were not traced
+        lines = self.rf.record(cycle)
+        return parse_rf(lines) if lines is not None else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Look up the pipeline state and register file of traced cycles without scanning the trace')
+    parser.add_argument('--iodir', default="", type=str, help='Directory containing the trace files.')
+    parser.add_argument('--core', default="FS", choices=["SS", "FS"], help='Which core\'s traces to read.')
+    parser.add_argument('--cycles', default=None, type=parse_cycles, help='Cycle N or range FIRST:LAST to print.')
+    parser.add_argument('--values', action='store_true', help='Print the parsed latch fields and the nonzero registers instead of the raw records.')
+    parser.add_argument('--build', action='store_true', help='Only (re)build the .idx files of every trace in the IO directory.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir)
+    if args.build:
+        for name in sorted(os.listdir(ioDir)):
+            if name.endswith(".txt") and (name.startswith("StateResult_") or name.endswith("_RFResult.txt")):
+                path = os.path.join(ioDir, name)
+                index = build_index(path)
+                index.save(path + ".idx")
+                print("Indexed %d cycles of %s" % (len(index.cycles), path))
+        raise SystemExit(0)
+    if args.cycles is None:
+        parser.error("--cycles is required unless --build is given")
+
+    query = TraceQuery(ioDir, args.core)
+    first, last = args.cycles
+    if last == float("inf"):
+        last = query.state.cycles[-1] if len(query.state.cycles) else first
+    records = query.between(first, last)
+    if not records:
+        print("No traced cycles in %s" % (str(first) if first == last else "%d:%s" % (first, last)))
+    for cycle, state, rf in records:
+        if args.values:
+            print("Cycle %d" % cycle)
+            for key, val in parse_state(state).items():
+                print("  %s = %s" % (key, val))
+            if rf is not None:
+                print("  " + " ".join("x%d=%d" % (reg, val) for reg, val in enumerate(parse_rf(rf)) if val))
+            continue
+        print("".join(state), end="")
+        if rf is not None:
+            print("".join(rf), end="")
@@ -0,0 +1,93 @@
+import os
+import struct
+from array import array
+
+TRACE_OFF = 0
+TRACE_FINAL = 1 # only the state after the last cycle
+TRACE_CYCLE = 2 # state after every cycle, optionally limited to a cycle range
+
+TRACE_LEVELS = {"off": TRACE_OFF, "final": TRACE_FINAL, "cycle": TRACE_CYCLE}
+
+BUFFER_SIZE = 1 << 20
+
+# <trace>.idx sidecar: header, then the cycle numbers (uint32) and the byte offsets of their records (uint64)
+INDEX_MAGIC = b"RVTI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sBQQ") # magic, version, size of the trace file, number of records
+
+class CycleIndex(object):
+    def __init__(self):
+        self.cycles = array("I")
+        self.offsets = array("Q")
+        self.size = 0 # bytes written so far
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.size, len(self.cycles)))
+            f.write(self.cycles.tobytes())
+            f.write(self.offsets.tobytes())
+
+class Tracer(object):
+    def __init__(self, level=TRACE_CYCLE, cycles=None, index=False):
+        self.level = level
+        self.cycles = cycles # inclusive (first, last) cycle range, None traces every cycle
+        self.files = {}
+        self.indexes = {} if index else None # path -> CycleIndex, saved next to every trace file on close
+        self.cycle = None # cycle of the record being written
+
+    def wants(self, cycle):
+        if self.level != TRACE_CYCLE:
+            return False
+        return self.cycles is None or self.cycles[0] <= cycle <= self.cycles[1]
+
+    def record(self, core, cycle):
+        self.cycle = cycle
+        core.myRF.outputRF(cycle)
+        core.printState(core.state, cycle)
+        self.cycle = None
+
+    def open(self, path, mode="w"):
+        # files stay open for the whole run and are truncated on their first write
+        wf = self.files.get(path)
+        if wf is None:
+            wf = self.files[path] = open(path, mode, buffering=BUFFER_SIZE)
+        return wf
+
+    def write(self, path, lines):
+        if self.indexes is not None:
+            # the dumps are ASCII, characters written are bytes written
+            index = self.indexes.get(path)
+            if index is None:
+                index = self.indexes[path] = CycleIndex()
+            if self.cycle is not None:
+                index.cycles.append(self.cycle)
+                index.offsets.append(index.size)
+            index.size += sum(map(len, lines))
+        self.open(path).writelines(lines)
+
+    def close(self):
+        for wf in self.files.values():
+            wf.close()
+        self.files = {}
+        if self.indexes:
+            for path, index in self.indexes.items():
+                index.save(path + ".idx")
+            self.indexes = {}
+
+class SinkTracer(Tracer):
+    # hands every dump to sink(name, lines) instead of writing files, name is the result file the
+    # lines would have gone to (SS_RFResult.txt, StateResult_FS.txt, ...)
+    def __init__(self, sink, level=TRACE_CYCLE, cycles=None):
+        super(SinkTracer, self).__init__(level, cycles)
+        self.sink = sink
+
+    def write(self, path, lines):
+        self.sink(os.path.basename(path), lines)
+
+    def close(self):
+        pass
+
+def parse_cycle_range(text):
+    # "first:last" with either side optional
+    first, _, last = text.partition(":")
+    return (int(first) if first else 0, int(last) if last else float("inf"))
@@ -0,0 +1,140 @@
+from functional import FunctionalCore, main
+from instruction import INSTR_TYPES
+
+MAX_BLOCK = 256 # instructions translated into one function at most
+
+# ALU control value -> Python expression over two signed 32-bit operands
+ALU_EXPRESSIONS = {
+    0b0000: "{a} & {b}",
+    0b0001: "{a} | {b}",
+    0b0010: "(({a} + {b} + 2147483648) & 4294967295) - 2147483648",
+    0b0110: "(({a} - {b} + 2147483648) & 4294967295) - 2147483648",
+    0b1110: "{a} ^ {b}",
+}
+
+class Block(object):
+    def __init__(self, start, length, source, function):
+        self.start = start
+        self.length = length
+        self.source = source
+        self.function = function
+
+class TranslatingCore(FunctionalCore):
+    # translates each basic block of InsMem into a compiled Python function on first execution.
+    # A block is called as block(regs, readDataMem, writeDataMem, budget) and returns
+    # (next pc, instructions executed, halted). A block whose last instruction jumps back to its
+    # own start loops internally for as long as `budget` allows.
+    def __init__(self, ioDir, imem, dmem, tracer=None):
+        super(TranslatingCore, self).__init__(ioDir, imem, dmem, tracer)
+        self.blocks = {} # start PC -> Block
+
+    def invalidate(self, Address):
+        super(TranslatingCore, self).invalidate(Address)
+        self.blocks.clear()
+
+    def alu_expression(self, parsed_instr, a, b):
+        return ALU_EXPRESSIONS[parsed_instr.alu_control.get_operation()].format(a=a, b=b)
+
+    def translate(self, start):
+        body = []
+        pc = start
+        branch = None # (condition, taken pc) of the closing branch, condition None for an unconditional jump
+        fall_through = None
+        halted = False
+
+        while True:
+            parsed_instr = self.ext_imem.decodeInstr(pc)
+            instr_type = parsed_instr.instr_type
+            rd, rs1, rs2 = parsed_instr.rd, parsed_instr.rs1, parsed_instr.rs2
+
+            if instr_type == INSTR_TYPES.HALT:
+                halted = True
+                break
+            elif instr_type == INSTR_TYPES.R:
+                if rd:
+                    body.append("regs[%d] = %s" % (rd, self.alu_expression(parsed_instr, "regs[%d]" % rs1, "regs[%d]" % rs2)))
+            elif instr_type == INSTR_TYPES.I:
+                if rd:
+                    body.append("regs[%d] = %s" % (rd, self.alu_expression(parsed_instr, "regs[%d]" % rs1, int(parsed_instr.imm))))
+            elif instr_type == INSTR_TYPES.LOAD_I:
+                body.append("val = readDataMem(%s)" % self.alu_expression(parsed_instr, "regs[%d]" % rs1, int(parsed_instr.imm)))
+                if rd:
+                    body.append("regs[%d] = val" % rd)
+            elif instr_type == INSTR_TYPES.S:
+                body.append("writeDataMem(%s, regs[%d])" % (self.alu_expression(parsed_instr, "regs[%d]" % rs1, int(parsed_instr.imm)), rs2))
+            elif instr_type == INSTR_TYPES.J:
+                if rd:
+                    body.append("regs[%d] = %d" % (rd, pc + 4))
+                branch = (None, pc + parsed_instr.imm)
+                break
+            elif instr_type == INSTR_TYPES.B:
+                if parsed_instr.funct3 == 0b000:
+                    branch = ("regs[%d] == regs[%d]" % (rs1, rs2), pc + parsed_instr.imm)
+                elif parsed_instr.funct3 == 0b001:
+                    branch = ("regs[%d] != regs[%d]" % (rs1, rs2), pc + parsed_instr.imm)
+                fall_through = pc + 4
+                break
+
+            pc += 4
+            if (pc - start) // 4 >= MAX_BLOCK:
+                fall_through = pc
+                break
+
+        length = (pc - start) // 4 + (0 if fall_through == pc else 1)
+        lines = ["def block(regs, readDataMem, writeDataMem, budget):"]
+
+        if branch is not None and branch[1] == start:
+            # the block branches back to itself, iterate here instead of returning to the dispatcher
+            lines.append("    n = 0")
+            lines.append("    while n + %d <= budget:" % length)
+            lines.append("        n += %d" % length)
+            lines.extend("        " + line for line in body)
+            if branch[0] is None:
+                lines.append("        continue")
+            else:
+                lines.append("        if %s:" % branch[0])
+                lines.append("            continue")
+                lines.append("        return %d, n, False" % fall_through)
+            lines.append("    return %d, n, False" % start)
+        else:
+            lines.extend("    " + line for line in body)
+            if halted:
+                lines.append("    return %d, %d, True" % (pc, length))
+            elif branch is None:
+                lines.append("    return %d, %d, False" % (fall_through, length))
+            elif branch[0] is None:
+                lines.append("    return %d, %d, False" % (branch[1], length))
+            else:
+                lines.append("    return (%d if %s else %d), %d, False" % (branch[1], branch[0], fall_through, length))
+
+        source = "\n".join(lines) + "\n"
+        namespace = {}
+        exec(compile(source, "<block 0x%08x>" % start, "exec"), namespace)
+        block = self.blocks[start] = Block(start, length, source, namespace["block"])
+        return block
+
+    def run(self, limit=None):
+        regs = self.myRF.Registers
+        readDataMem = self.ext_dmem.readDataMem
+        writeDataMem = self.ext_dmem.writeDataMem
+        blocks = self.blocks
+        count = 0
+        if limit is None:
+            limit = float("inf")
+
+        while count < limit and not self.halted:
+            block = blocks.get(self.pc)
+            if block is None:
+                block = self.translate(self.pc)
+            if count + block.length > limit:
+                # not enough budget left for a whole block, finish instruction by instruction
+                self.instructions += count
+                return count + super(TranslatingCore, self).run(limit - count)
+            self.pc, executed, self.halted = block.function(regs, readDataMem, writeDataMem, limit - count)
+            count += executed
+
+        self.instructions += count
+        return count
+
+if __name__ == "__main__":
+    main('Functional RV32I simulator using basic-block translation, final architectural state only', TranslatingCore)
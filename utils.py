@@ -1,30 +1,22 @@
-def sign_extend_32(binary_str,prefix=None):
-    if prefix is None:
-        prefix = binary_str[0]
-    return prefix*(32-len(binary_str)) + binary_str
-
-def sign_extend_12(binary_str):
-    if binary_str[0] == '1':
-        return sign_extend_32(binary_str,'1')
-    return sign_extend_32(binary_str,'0')
+def sign_extend(value,bits):
+    # interpret the low `bits` bits of value as a two's complement number
+    value &= (1 << bits) - 1
+    if value >> (bits-1):
+        value -= 1 << bits
+    return value
 
 def sign_safe_int(x):
+    # wrap to 32 bits and return the signed value
+    x &= 0xFFFFFFFF
     if x>2147483647:
         x -= 2*2147483648
     return x
 
 def sign_safe_add(a,b):
-    return sign_safe_int(a)+sign_safe_int(b)
-
-def sign_safe_binary_to_int(x):
-    x = int(x,2)
-    return sign_safe_int(x)
+    return sign_safe_int(a+b)
 
 def sign_safe_subtract(a,b):
-    return sign_safe_int(a)-sign_safe_int(b)
+    return sign_safe_int(a-b)
 
 def sign_safe_binary_conversion(x):
-    if x<0:
-        x += 2*2147483648
-        return format(x,'b')[:32]
-    return sign_extend_32(format(x,'b')[:32],'0')
\ No newline at end of file
+    return format(x & 0xFFFFFFFF,'032b')
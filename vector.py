@@ -0,0 +1,193 @@
+import os
+import time
+import argparse
+from core import InsMem, DMEM_DUMP_SIZE, format_rf
+from memory import BYTE_LINES
+from images import load_image, load_instruction_image
+from alu import ALU
+from utils import sign_extend
+from functional import predecode, OP_R, OP_I, OP_LOAD, OP_STORE, OP_BEQ, OP_BNE, OP_JAL, OP_HALT
+
+try:
+    import numpy as np
+except ImportError: # optional, only the batch engine needs it
+    np = None
+
+# Runs the functional model over many lanes at once. Every lane has its own registers, data memory
+# and PC, held as NumPy arrays. Each iteration picks the lowest (program, PC) among the running lanes
+# and executes that instruction for every lane sitting there, lanes that took different branches
+# simply wait their turn and run together again once their PCs meet.
+
+if np is not None:
+    VECTOR_ALU = {
+        ALU[0b0000]: np.bitwise_and,
+        ALU[0b0001]: np.bitwise_or,
+        ALU[0b0010]: np.add, # int32 arrays wrap like sign_safe_add
+        ALU[0b0110]: np.subtract,
+        ALU[0b1110]: np.bitwise_xor,
+    }
+
+class BatchResult(object):
+    def __init__(self, core):
+        self.registers = core.registers # (lanes, 32) int32
+        self.memory = core.memory # (lanes, memory size) uint8
+        self.instructions = core.instructions # per lane, HALT included
+        self.halted = core.halted
+        self.pc = core.pc
+
+    def __len__(self):
+        return len(self.registers)
+
+    def lane_registers(self, lane):
+        return [int(val) for val in self.registers[lane]]
+
+    def read_word(self, lane, Address):
+        return int(self.memory[lane, Address:Address+4].view(">i4")[0])
+
+    def dump_lines(self, lane, start=0, end=None):
+        return "".join(map(BYTE_LINES.__getitem__, self.memory[lane, start:end].tolist()))
+
+class BatchFunctionalCore(object):
+    def __init__(self, programs, images, memory_size=None, entry=0, base=0):
+        # programs is one instruction image shared by all lanes or one per lane, images holds the
+        # initial data memory of every lane, programs start at address base. Data memory is dense,
+        # memory_size bytes per lane.
+        if np is None:
+            raise ImportError("vector.py needs NumPy for the batch engine")
+        lanes = len(images)
+        if isinstance(programs, (bytes, bytearray)):
+            programs = [programs] * lanes
+        if len(programs) != lanes:
+            raise ValueError("%d programs for %d lanes" % (len(programs), lanes))
+
+        self.imems = []
+        ids, index = [], {}
+        for program in programs:
+            program = bytes(program)
+            if program not in index:
+                index[program] = len(self.imems)
+                self.imems.append(InsMem("Imem", "", bytearray(program), base=base))
+            ids.append(index[program])
+        self.lane_program = np.array(ids, dtype=np.int64)
+        self.ops = {} # (program, PC) -> predecoded operation
+
+        if memory_size is None:
+            memory_size = max([DMEM_DUMP_SIZE] + [len(image) for image in images])
+        self.memory = np.zeros((lanes, memory_size), dtype=np.uint8)
+        for lane, image in enumerate(images):
+            self.memory[lane, :len(image)] = np.frombuffer(bytes(image), dtype=np.uint8)
+
+        self.registers = np.zeros((lanes, 32), dtype=np.int32)
+        self.pc = np.full(lanes, entry, dtype=np.int64)
+        self.instructions = np.zeros(lanes, dtype=np.int64)
+        self.halted = np.zeros(lanes, dtype=bool)
+        self.offsets = np.arange(4)
+
+    def op(self, program, pc):
+        op = self.ops.get((program, pc))
+        if op is None:
+            op = self.ops[(program, pc)] = predecode(self.imems[program].decodeInstr(pc))
+        return op
+
+    def addresses(self, lanes, addresses):
+        addresses = addresses.astype(np.int64) & 0xFFFFFFFF
+        if len(addresses) and addresses.max() + 4 > self.memory.shape[1]:
+            lane = lanes[addresses.argmax()]
+            raise IndexError("lane %d accesses address %d beyond the %d byte batch memory" % (lane, addresses.max(), self.memory.shape[1]))
+        return addresses[:, None] + self.offsets
+
+    def read_words(self, lanes, addresses):
+        addresses = np.where(addresses % 4 != 0, addresses // 4, addresses) # same quirk as DataMem.readDataMem
+        data = self.memory[lanes[:, None], self.addresses(lanes, addresses)].astype(np.uint32)
+        words = (data[:, 0] << 24) | (data[:, 1] << 16) | (data[:, 2] << 8) | data[:, 3]
+        return words.view(np.int32)
+
+    def write_words(self, lanes, addresses, values):
+        words = values.view(np.uint32)
+        data = np.stack([words >> 24, words >> 16, words >> 8, words], axis=1).astype(np.uint8)
+        self.memory[lanes[:, None], self.addresses(lanes, addresses)] = data
+
+    def execute(self, op, pc, lanes):
+        kind, rd, rs1, rs2, imm, alu = op
+        regs = self.registers
+        if kind == OP_R:
+            if rd:
+                regs[lanes, rd] = VECTOR_ALU[alu](regs[lanes, rs1], regs[lanes, rs2])
+            self.pc[lanes] = pc + 4
+        elif kind == OP_I:
+            if rd:
+                regs[lanes, rd] = VECTOR_ALU[alu](regs[lanes, rs1], np.int32(imm))
+            self.pc[lanes] = pc + 4
+        elif kind == OP_LOAD:
+            values = self.read_words(lanes, VECTOR_ALU[alu](regs[lanes, rs1], np.int32(imm)))
+            if rd:
+                regs[lanes, rd] = values
+            self.pc[lanes] = pc + 4
+        elif kind == OP_STORE:
+            self.write_words(lanes, VECTOR_ALU[alu](regs[lanes, rs1], np.int32(imm)), regs[lanes, rs2])
+            self.pc[lanes] = pc + 4
+        elif kind == OP_BEQ:
+            self.pc[lanes] = np.where(regs[lanes, rs1] == regs[lanes, rs2], pc + imm, pc + 4)
+        elif kind == OP_BNE:
+            self.pc[lanes] = np.where(regs[lanes, rs1] != regs[lanes, rs2], pc + imm, pc + 4)
+        elif kind == OP_JAL:
+            if rd:
+                regs[lanes, rd] = sign_extend(pc + 4, 32) # link addresses above 2 GiB wrap like the registers
+            self.pc[lanes] = pc + imm
+        elif kind == OP_HALT:
+            self.halted[lanes] = True
+        else:
+            self.pc[lanes] = pc + 4
+
+    def run(self, limit=None):
+        # run every lane until HALT or until it has executed `limit` instructions, returns the number
+        # of vector steps taken
+        steps = 0
+        while True:
+            running = ~self.halted
+            if limit is not None:
+                running &= self.instructions < limit
+            if not running.any():
+                return steps
+            keys = (self.lane_program << 32) | self.pc
+            key = int(keys[running].min())
+            lanes = np.flatnonzero(running & (keys == key))
+            program, pc = key >> 32, key & 0xFFFFFFFF
+            self.execute(self.op(program, pc), pc, lanes)
+            self.instructions[lanes] += 1
+            steps += 1
+
+def run_batch(programs, images, max_instructions=None, memory_size=None, entry=0, base=0):
+    core = BatchFunctionalCore(programs, images, memory_size, entry, base)
+    core.run(max_instructions)
+    return BatchResult(core)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run one RV32I program over many data memory images at once with NumPy')
+    parser.add_argument('--iodir', default="", type=str, help='Directory containing imem.txt or imem.bin.')
+    parser.add_argument('inputs', nargs='*', type=str, help='dmem.txt or dmem.bin style inputs, one lane each. Defaults to dmem.txt in the IO directory.')
+    parser.add_argument('--max-instructions', default=10000000, type=int, help='Stop a lane after this many instructions if HALT is not reached.')
+    parser.add_argument('--outdir', default=None, type=str, help='Write <input>_FN_RFResult.txt and <input>_FN_DMEMResult.txt for every lane here.')
+    args = parser.parse_args()
+
+    ioDir = os.path.abspath(args.iodir)
+    print("IO Directory:", ioDir)
+    inputs = args.inputs or [os.path.join(ioDir, "dmem.txt")]
+    images = [load_image(path) for path in inputs]
+    program, entry, base = load_instruction_image(ioDir)
+
+    start = time.perf_counter()
+    result = run_batch(bytes(program), images, args.max_instructions, entry=entry, base=base)
+    elapsed = time.perf_counter() - start
+    total = int(result.instructions.sum())
+    print("Lanes: %d, halted: %d, instructions: %d" % (len(result), int(result.halted.sum()), total))
+    if elapsed > 0:
+        print("Instructions per second:", int(total / elapsed))
+
+    if args.outdir:
+        for lane, path in enumerate(inputs):
+            prefix = os.path.join(args.outdir, os.path.splitext(os.path.basename(path))[0] + "_FN_")
+            with open(prefix + "RFResult.txt", "w") as f:
+                f.writelines(format_rf(result.lane_registers(lane), int(result.instructions[lane])))
+            with open(prefix + "DMEMResult.txt", "w") as f:
+                f.write(result.dump_lines(lane, 0, max(len(images[lane]), DMEM_DUMP_SIZE)))